@@ -0,0 +1,80 @@
+"""
+Benchmarks of the solvers.
+
+Usage:
+
+  python bench.py pdb [pdb_dir]
+  python bench.py ida [scramble_length] [cube_count] [pdb_dir]
+  python bench.py freecell [first_deal] [deal_count]
+
+"""
+
+import os
+import random
+import sys
+import time
+
+import freecell_v1
+import magic_cube
+
+
+def bench_pdb(path=magic_cube.PDB_PATH):
+    """ builds the cube pattern databases """
+    print "%-20s %10s %10s" % ("pattern", "sec", "bytes")
+    for pattern in magic_cube.PATTERNS:
+        job_time = time.time()
+        file_name = magic_cube.build_pdb(pattern, path)
+        job_time = time.time() - job_time
+        print "%-20s %10.2f %10d" % (pattern[0], job_time, os.path.getsize(file_name))
+
+
+def bench_ida(length=10, count=10, path=magic_cube.PDB_PATH):
+    """ solves random scrambles with IDA* """
+    pdbs = magic_cube.load_pdbs(path)
+    random.seed(length)
+
+    nodes = 0
+    job_time = time.time()
+    print "%6s %12s %10s %12s" % ("moves", "nodes", "sec", "nodes/sec")
+    for i in range(count):
+        cube = magic_cube.turn_all(magic_cube.SOLVED, magic_cube.scramble(length))
+        stats = magic_cube.Stats()
+        t = time.time()
+        moves = magic_cube.solve_ida(cube, pdbs, stats)
+        t = time.time() - t
+        nodes += stats.nodes
+        print "%6d %12d %10.2f %12d" % (len(moves), stats.nodes, t, stats.nodes / max(t, 1e-6))
+
+    job_time = time.time() - job_time
+    print "Total: %d nodes, %.2f sec, %d nodes/sec" % (nodes, job_time, nodes / max(job_time, 1e-6))
+
+
+def bench_freecell(first=1, count=5):
+    """ solves FreeCell deals with the scalar and the numpy layer expansion """
+    desk = freecell_v1.new_desk()
+    total = [0.0, 0.0]
+    print "%6s %8s %10s %10s" % ("deal", "moves", "scalar", "numpy")
+    for n in range(first, first + count):
+        freecell_v1.deal_by_number(desk, n)
+        times = []
+        for vectorized in (False, True):
+            t = time.time()
+            moves = freecell_v1.get_solution(desk, vectorized=vectorized)
+            times.append(time.time() - t)
+        total = [a + b for a, b in zip(total, times)]
+        print "%6d %8d %10.2f %10.2f" % (n, len(moves), times[0], times[1])
+
+    print "Total: %.2f sec scalar, %.2f sec numpy" % tuple(total)
+
+
+if __name__ == '__main__':
+    what = sys.argv[1] if len(sys.argv) > 1 else 'ida'
+    args = sys.argv[2:]
+    if what == 'pdb':
+        bench_pdb(*args)
+    elif what == 'ida':
+        bench_ida(*[int(x) for x in args[:2]] + args[2:])
+    elif what == 'freecell':
+        bench_freecell(*[int(x) for x in args])
+    else:
+        print __doc__
@@ -27,6 +27,20 @@ The game is won after all cards are moved to their base piles.
 
 '''
 
+import heapq
+import itertools
+import os
+import struct
+import sys
+import tempfile
+
+import search
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 _debug = __name__ == '__main__'
 
 if _debug:
@@ -233,24 +247,33 @@ def get_progress(desk):
           n = n + (rank_b - rank_a)
   return n
 
+def get_score(desk):
+  return count_empty_cells(desk) - get_progress(desk)
+
+def get_move_score(desk, move):
+  # get_score after the move and the auto moves it leads to
+  moves = [move]
+  move_card(desk, move)
+  auto_move_to_bases(desk, moves)
+  score = get_score(desk)
+  move_cards_reverse(desk, moves) # restore our desk
+  return score
+
+# ENTRY of a frontier is defined as:
+# (moves, get_score of the desk after the moves and their auto moves)
+# the score is taken when the last move is added, while the desk is at
+# hand, so the frontier can be split without replaying the moves
+
 def add_to_set_at(src, i, j):
   if i not in src:
     src[i] = set()
   src[i].add(j)
 
-def split(desk, moves, threshold):
+def split(entries, threshold):
   strategy = {}
   
-  for i, m in enumerate(moves):
-    move_cards(desk, m)
-    auto_move_to_bases(desk, m)
-    
-    n_1 = count_empty_cells(desk)
-    n_2 = get_progress(desk)
-    
-    add_to_set_at(strategy, n_1 - n_2, i)
-
-    move_cards_reverse(desk, m)
+  for i, entry in enumerate(entries):
+    add_to_set_at(strategy, entry[1], i)
   
   keys = strategy.keys()
   keys.sort()
@@ -259,14 +282,14 @@ def split(desk, moves, threshold):
   while len(mask_a) < threshold:
     mask_a |= strategy.pop(keys.pop(-1))
   
-  mask_b = set(xrange(len(moves))) - mask_a
-  return [moves[i] for i in mask_a], [moves[i] for i in mask_b]
+  mask_b = set(xrange(len(entries))) - mask_a
+  return [entries[i] for i in mask_a], [entries[i] for i in mask_b]
 
 def test_moves(desk, src_moves, src_done, solution):
   dst_moves = []
   dst_done = {}
     
-  for moves in src_moves:
+  for moves, score in src_moves:
     move_cards(desk, moves)
     auto_move_to_bases(desk, moves)
       
@@ -291,45 +314,518 @@ def test_moves(desk, src_moves, src_done, solution):
             new_moves = moves[:]
             new_moves.append(move)
             
-            dst_moves.append(new_moves)
+            dst_moves.append((new_moves, get_move_score(desk, move)))
       
     move_cards_reverse(desk, moves) # restore our desk
 
   return solution, dst_moves, dst_done
 
-DESK_NUM_MAX = 8000
-DESK_NUM_MIN = 2000
+# PACKED DESK of the numpy backend is a row of uint8:
+# the lengths of the DESK_SIZE piles, then PACK_PILE_SIZE places for the
+# cards of each pile and cell; the bases need no cards, the length tells
 
-def get_solution(desk):
-  src_moves = [[move] for move in get_moves(desk)]
-  src_done = {}
-  
-  reserve = []
-  
-  solution = None
-  
-  while True:
-    while src_moves:
-      if _debug:
-        print len(src_moves)
-      if len(src_moves) > DESK_NUM_MAX:
-        if _debug:
-          print "Splitting..."
-        a, b = split(desk, src_moves, DESK_NUM_MIN)
-        reserve.append((b, src_done))
-        src_moves = a
+PACK_PILE_SIZE = 20  # 7 dealt cards and 13 built on them at most
+PACK_CARDS = DESK_SIZE
+PACK_SIZE = PACK_CARDS + CELL_END * PACK_PILE_SIZE
+PILE_HASH = 1000003  # multipliers of the hashes of a pile and of a desk
+DESK_HASH = 0x9E3779B97F4A7C15
+
+def pack_desk(desk):
+  row = [0] * PACK_SIZE
+  for i in DESK_RANGE:
+    row[i] = len(desk[i])
+  for i in PLAY_RANGE:
+    offset = PACK_CARDS + i * PACK_PILE_SIZE
+    row[offset:offset + len(desk[i])] = desk[i]
+  return numpy.array(row, numpy.uint8)
+
+def unpack_desk(row):
+  row = row.tolist()
+  desk = new_desk()
+  for i in PLAY_RANGE:
+    offset = PACK_CARDS + i * PACK_PILE_SIZE
+    desk[i] = row[offset:offset + row[i]]
+  for i in BASE_RANGE:
+    desk[i] = [rank * SUIT_NUM + i - BASE_START for rank in range(row[i])]
+  return desk
+
+def move_layer(layer, rows, moves):
+  # makes a move on each of the rows of the layer, in place
+  src = moves // DESK_SIZE
+  dst = moves  % DESK_SIZE
+  size = layer[rows, src].astype(numpy.intp) - 1
+  card = layer[rows, PACK_CARDS + src * PACK_PILE_SIZE + size]
+  layer[rows, src] = size
+  to_pile = dst < BASE_START
+  r, d = rows[to_pile], dst[to_pile]
+  layer[r, PACK_CARDS + d * PACK_PILE_SIZE + layer[r, d]] = card[to_pile]
+  layer[rows, dst] += 1
+
+def replay_layer(desk, lines):
+  # the desk after each line of moves, as a layer
+  layer = numpy.tile(pack_desk(desk), (len(lines), 1))
+  sizes = numpy.array([len(line) for line in lines], numpy.intp)
+  moves = numpy.fromiter(itertools.chain.from_iterable(lines), numpy.intp, sizes.sum())
+  starts = numpy.cumsum(sizes) - sizes
+  for step in xrange(sizes.max() if len(lines) else 0):
+    rows = numpy.flatnonzero(sizes > step)
+    move_layer(layer, rows, moves[starts[rows] + step])
+  return layer
+
+def get_layer_tops(layer):
+  # the top cards of the piles and cells, and whether there is one
+  sizes = layer[:, PLAY_RANGE].astype(numpy.intp)
+  places = PACK_CARDS + numpy.arange(CELL_END) * PACK_PILE_SIZE + numpy.maximum(sizes - 1, 0)
+  tops = layer[numpy.arange(len(layer))[:, None], places].astype(numpy.intp)
+  return tops, sizes > 0
+
+def auto_move_layer(layer):
+  # auto_move_to_bases on every row, in place; returns the moves of each row
+  events = []  # (rows, moves) in the order they are made
+  rows = numpy.arange(len(layer))
+  while len(rows):
+    moved = numpy.zeros(len(layer), bool)
+    for i in PLAY_RANGE:
+      part = layer[rows]
+      size = part[:, i].astype(numpy.intp)
+      card = part[numpy.arange(len(rows)), PACK_CARDS + i * PACK_PILE_SIZE + numpy.maximum(size - 1, 0)]
+      suit = card  % SUIT_NUM
+      rank = card // SUIT_NUM
+      bases = part[:, BASE_START:BASE_END]
+      ro = bases[numpy.arange(len(rows)), suit]
+      rx = bases[numpy.arange(len(rows)), (suit + 1) % SUIT_NUM]
+      ry = bases[numpy.arange(len(rows)), (suit + 3) % SUIT_NUM]
+      ok = (size > 0) & (rank == ro) & (rank < rx + 2) & (rank < ry + 2)
+      if ok.any():
+        r = rows[ok]
+        m = i * DESK_SIZE + BASE_START + suit[ok].astype(numpy.intp)
+        move_layer(layer, r, m)
+        events.append((r, m))
+        moved[r] = True
+    rows = numpy.flatnonzero(moved)
+
+  autos = [[] for i in xrange(len(layer))]
+  for r, m in events:
+    for row, move in zip(r.tolist(), m.tolist()):
+      autos[row].append(move)
+  return autos
+
+def get_layer_moves(layer):
+  # get_moves of every row: (rows, moves) in the order get_moves gives them
+  n = len(layer)
+  tops, full = get_layer_tops(layer)
+  sizes = layer[:, PLAY_RANGE]
+  suit = tops  % SUIT_NUM
+  rank = tops // SUIT_NUM
+  red = (suit == DIAMONDS) | (suit == HEARTS)
+
+  # slots of a source: the base, the PILE_NUM piles, an empty cell, an empty pile
+  slots = 1 + PILE_NUM + 2
+  ok = numpy.zeros((n, CELL_END, slots), bool)
+  dst = numpy.zeros((n, CELL_END, slots), numpy.intp)
+
+  bases = layer[:, BASE_START:BASE_END]
+  ok[:, :, 0] = full & (bases[numpy.arange(n)[:, None], suit] == rank)
+  dst[:, :, 0] = BASE_START + suit
+
+  pile_ok = full[:, None, PILE_RANGE] & (rank[:, None, PILE_RANGE] == rank[:, :, None] + 1) & \
+            (red[:, None, PILE_RANGE] != red[:, :, None])
+  ok[:, :, 1:1 + PILE_NUM] = full[:, :, None] & pile_ok
+  dst[:, :, 1:1 + PILE_NUM] = PILE_RANGE
+
+  empty_cell = sizes[:, CELL_RANGE] == 0
+  empty_pile = sizes[:, PILE_RANGE] == 0
+  ok[:, :, -2] = (sizes > 1) & empty_cell.any(axis=1)[:, None]
+  dst[:, :, -2] = (CELL_START + empty_cell.argmax(axis=1))[:, None]
+  ok[:, :, -1] = (sizes > 1) & empty_pile.any(axis=1)[:, None]
+  dst[:, :, -1] = empty_pile.argmax(axis=1)[:, None]
+
+  rows, src, slot = numpy.nonzero(ok)
+  return rows, src * DESK_SIZE + dst[rows, src, slot]
+
+def get_layer_keys(layer):
+  # get_base_key of every row, and a hash of the sorted piles for get_pile_key
+  bases = layer[:, BASE_START:BASE_END].astype(numpy.intp)
+  base_keys = ((bases[:, SPADES] * RANK_NUM + bases[:, DIAMONDS]) * RANK_NUM +
+               bases[:, CLUBS]) * RANK_NUM + bases[:, HEARTS]
+
+  cards = layer[:, PACK_CARDS:PACK_CARDS + PILE_NUM * PACK_PILE_SIZE].reshape(-1, PILE_NUM, PACK_PILE_SIZE)
+  places = numpy.arange(PACK_PILE_SIZE)
+  cards = numpy.where(places < layer[:, PILE_RANGE, None], cards.astype(numpy.uint64) + 1, 0)
+  pile_hash = numpy.zeros(cards.shape[:2], numpy.uint64)
+  for i in places:
+    pile_hash = pile_hash * numpy.uint64(PILE_HASH) + cards[:, :, i]
+  # mixed, so the pile hashes do not cancel out in the desk hash
+  pile_hash ^= pile_hash >> numpy.uint64(29)
+  pile_hash *= numpy.uint64(DESK_HASH)
+  pile_hash ^= pile_hash >> numpy.uint64(32)
+  pile_hash.sort(axis=1)
+  keys = numpy.zeros(len(layer), numpy.uint64)
+  for i in PILE_RANGE:
+    keys = keys * numpy.uint64(DESK_HASH) + pile_hash[:, i]
+  return base_keys, keys
+
+def get_layer_scores(layer):
+  # get_score of every row
+  empty = (layer[:, PLAY_RANGE] == 0).sum(axis=1)
+  size = int(layer[:, PILE_RANGE].max())
+  cards = layer[:, PACK_CARDS:PACK_CARDS + PILE_NUM * PACK_PILE_SIZE].reshape(-1, PILE_NUM, PACK_PILE_SIZE)
+  ranks = (cards[:, :, :size] // SUIT_NUM).astype(numpy.int16)
+  # no card ranks -1, below any card it could follow
+  ranks[numpy.arange(size) >= layer[:, PILE_RANGE, None]] = -1
+  progress = numpy.zeros(len(layer), numpy.intp)
+  for a in xrange(size - 1):
+    up = ranks[:, :, a + 1:] - ranks[:, :, a:a + 1]
+    progress += numpy.maximum(up, 0).sum(axis=(1, 2))
+  return empty - progress
+
+def test_moves_numpy(desk, src_moves, src_done, solution):
+  # test_moves with the layer replayed, auto moved, keyed and expanded by
+  # numpy; the done-tables hold pile key hashes instead of get_pile_key
+  if numpy is None:
+    raise ImportError("test_moves_numpy needs numpy")
+  dst_moves = []
+  dst_done = {}
+  if not src_moves:
+    return solution, dst_moves, dst_done
+
+  lines = [moves for moves, score in src_moves]
+  layer = replay_layer(desk, lines)
+  autos = auto_move_layer(layer)
+  empty = (layer[:, PLAY_RANGE] == 0).all(axis=1).tolist()
+  base_keys, pile_keys = get_layer_keys(layer)
+  base_keys, pile_keys = base_keys.tolist(), pile_keys.tolist()
+  rows, next_moves = get_layer_moves(layer)
+  starts = numpy.searchsorted(rows, numpy.arange(len(layer) + 1)).tolist()
+  next_moves = next_moves.tolist()
+  dst_lines = []
+  parents = []  # the rows the dst_lines start from
+
+  for i, moves in enumerate(lines):
+    moves.extend(autos[i])
+
+    if solution == None or len(moves) < len(solution):
+      if empty[i]:
         if _debug:
-          print "Split #%d -> %d+%d" % (len(reserve), len(a), len(b))
+          print "Found %d moves solution" % len(moves)
+        solution = moves
+      else:
+        base_key = base_keys[i]
+        if base_key not in dst_done:
+          if base_key in src_done:
+            dst_done[base_key] = src_done[base_key]
+          else:
+            dst_done[base_key] = set()
 
-      solution, src_moves, src_done = test_moves(desk, src_moves, src_done, solution)
-    
-    if solution or not reserve:
+        pile_key = pile_keys[i]
+        if pile_key not in dst_done[base_key]:
+          dst_done[base_key].add(pile_key)
+
+          for move in next_moves[starts[i]:starts[i + 1]]:
+            new_moves = moves[:]
+            new_moves.append(move)
+
+            dst_lines.append(new_moves)
+            parents.append(i)
+
+  # the scores of the new entries, see get_move_score
+  if dst_lines:
+    children = layer[parents]
+    move_layer(children, numpy.arange(len(children)),
+               numpy.array([moves[-1] for moves in dst_lines], numpy.intp))
+    auto_move_layer(children)
+    dst_moves = zip(dst_lines, get_layer_scores(children).tolist())
+
+  return solution, dst_moves, dst_done
+
+# EXTERNAL DONE-TABLES keep the keys of every layer in a sorted file on disk.
+# The keys of a new layer are sorted in runs that fit in a share of the
+# memory budget and merged with the files of the layers before, so the
+# duplicates are found with sequential I/O only (delayed duplicate
+# detection). src_done is then the tuple of the layer files of the branch.
+
+KEY_PILE = CARD_NUM      # get_card_key of a card at the bottom of a pile
+KEY_CELL = CARD_NUM + 1
+KEY_BASE = CARD_NUM + 2
+KEY_SIZE = CARD_NUM
+RECORD_SIZE = KEY_SIZE + 4  # a key and the index of its entry
+RECORD_BYTES = sys.getsizeof('\0' * RECORD_SIZE) + 8  # in a list in memory
+RUN_SHARE = 4  # a run, and the read buffers of a merge, take this share of the budget
+
+def get_card_key(desk):
+  # what every card lies on; the same for the desks that differ in the
+  # order of the cascades and the cells only, like get_base_key + get_pile_key
+  key = [KEY_BASE] * CARD_NUM
+  for i in PILE_RANGE:
+    below = KEY_PILE
+    for card in desk[i]:
+      key[card] = below
+      below = card
+  for i in CELL_RANGE:
+    for card in desk[i]:
+      key[card] = KEY_CELL
+  return ''.join(map(chr, key))
+
+def read_records(path, size, buffer_size):
+  f = open(path, 'rb')
+  while True:
+    block = f.read(max(1, buffer_size // size) * size)
+    if not block:
       break
+    for i in xrange(0, len(block), size):
+      yield block[i:i + size]
+  f.close()
+
+class ExternalDone:
+  def __init__(self, path=None, budget=search.MEMORY_BUDGET):
+    # path: the directory of the files, a temporary one by default
+    # budget: the bytes of the search, see RUN_SHARE
+    self.run_size = max(1, budget // RUN_SHARE // RECORD_BYTES)
+    self.buffer_size = budget // RUN_SHARE
+    self.temporary = path is None
+    self.path = tempfile.mkdtemp(prefix='done') if path is None else path
+    if not os.path.isdir(self.path):
+      os.makedirs(self.path)
+    names = [int(name.split('.')[0]) for name in os.listdir(self.path) if name.endswith('.keys')]
+    self.names = itertools.count(max(names) + 1 if names else 0)
+    self.bytes_read = 0
+    self.bytes_written = 0
+
+  def new_path(self, suffix):
+    return os.path.join(self.path, '%d.%s' % (next(self.names), suffix))
+
+  def write(self, records, suffix):
+    path = self.new_path(suffix)
+    f = open(path, 'wb')
+    f.write(''.join(records))
+    f.close()
+    self.bytes_written += os.path.getsize(path)
+    return path
+
+  def start(self, desk):
+    return (self.write([get_card_key(desk)], 'keys'),)
+
+  def test_moves(self, desk, src_moves, src_done, solution):
+    # keys of the new desks to sorted runs
+    runs = []
+    records = []
+    for i, (moves, score) in enumerate(src_moves):
+      move_cards(desk, moves)
+      auto_move_to_bases(desk, moves)
+
+      if solution == None or len(moves) < len(solution):
+        if is_empty(desk):
+          if _debug:
+            print "Found %d moves solution" % len(moves)
+          solution = moves
+        else:
+          records.append(get_card_key(desk) + struct.pack('>I', i))
+          if len(records) == self.run_size:
+            records.sort()
+            runs.append(self.write(records, 'run'))
+            records = []
+
+      move_cards_reverse(desk, moves) # restore our desk
+    if records:
+      records.sort()
+      runs.append(self.write(records, 'run'))
+    del records
+
+    # merge the runs against the layers done, the first entry of a key wins;
+    # the new keys go straight to the file of the layer
+    buffer_size = self.buffer_size // (len(src_done) + len(runs))
+    done = heapq.merge(*[read_records(path, KEY_SIZE, buffer_size) for path in src_done])
+    done_key = next(done, None)
+    last = None
+    new = bytearray(len(src_moves))  # 1 for the entries of the new keys
+    path = self.new_path('keys')
+    f = open(path, 'wb')
+    for record in heapq.merge(*[read_records(run, RECORD_SIZE, buffer_size) for run in runs]):
+      key = record[:KEY_SIZE]
+      if key == last:
+        continue
+      last = key
+      while done_key is not None and done_key < key:
+        done_key = next(done, None)
+      if done_key != key:
+        f.write(key)
+        new[struct.unpack('>I', record[KEY_SIZE:])[0]] = 1
+    f.close()
+    self.bytes_written += os.path.getsize(path)
+    self.bytes_read += sum(os.path.getsize(name) for name in src_done + tuple(runs))
+    for run in runs:
+      os.remove(run)
+    dst_done = src_done + (path,)
+
+    # expand the new desks, their lines hold the auto moves already
+    dst_moves = []
+    for i, (moves, score) in enumerate(src_moves):
+      if not new[i]:
+        continue
+      move_cards(desk, moves)
+      for move in get_moves(desk):
+        new_moves = moves[:]
+        new_moves.append(move)
+
+        dst_moves.append((new_moves, get_move_score(desk, move)))
+      move_cards_reverse(desk, moves) # restore our desk
+
+    return solution, dst_moves, dst_done
+
+  def drop(self, src_done, dst_done):
+    # removes the files of an abandoned branch
+    for path in set(src_done) - set(dst_done):
+      os.remove(path)
+
+  def close(self):
+    for name in os.listdir(self.path):
+      if name.endswith('.keys') or name.endswith('.run'):
+        os.remove(os.path.join(self.path, name))
+    if self.temporary:
+      os.rmdir(self.path)
+
+DESK_NUM_MAX = 8000  # entries a frontier is never split below
+DESK_NUM_MIN = 2000  # entries a split keeps at least
+
+class Layers(search.Layers):
+  # the layered search of get_solution; the done-table of a layer holds
+  # the keys of the branch, so a part put aside takes it along
+  def __init__(self, desk, control, checkpoint, watch=None, vectorized=False, external=None):
+    search.Layers.__init__(self, control, checkpoint, watch)
+    self.desk = desk
+    self.vectorized = vectorized
+    self.external = external
+
+  def expand(self, entries, done, solution):
+    if _debug:
+      print len(entries)
+    if self.external:
+      return self.external.test_moves(self.desk, entries, done, solution)
+    elif self.vectorized:
+      return test_moves_numpy(self.desk, entries, done, solution)
     else:
+      return test_moves(self.desk, entries, done, solution)
+
+  def split(self, entries, n):
+    if _debug:
+      print "Splitting at %d bytes..." % self.stats.memory
+    a, b = split(entries, n)
+    if _debug:
+      print "Split -> %d+%d" % (len(a), len(b))
+    return a, b
+
+  def keys(self, done):
+    # the files of ExternalDone take no memory
+    if isinstance(done, dict):
+      return sum(len(piles) for piles in done.itervalues())
+    return 0
+
+  def header(self):
+    return self.desk
+
+  def memo(self):
+    if self.external:
+      return self.external.path, self.external.temporary
+    return None
+
+  def restore(self, memo):
+    if memo is not None:
+      path, temporary = memo
+      self.external = ExternalDone(path, self.control.budget)
+      self.external.temporary = temporary  # removed by close() as before
+
+  def save(self, state):
+    search.Layers.save(self, state)
+    if _debug:
+      print "Checkpoint: %d bytes" % self.stats.checkpoint_bytes
+
+  def stepped_back(self, done, state):
+    if _debug:
+      print "Step back to %d split" % (len(state[3]) + 1)
+    if self.external:
+      # the last checkpoint may need the files of the branch given up
+      if self.checkpoint.path is not None:
+        self.save(state)
+      self.external.drop(done, state[1])
+
+  def close(self, reserve):
+    search.Layers.close(self, reserve)
+    if self.external:
       if _debug:
-        print "Step back to %d split" % len(reserve)
-      src_moves, src_done = reserve.pop(-1)
-  return solution
+        print "Done-tables: %d bytes written, %d bytes read" % (
+          self.external.bytes_written, self.external.bytes_read)
+      self.external.close()
+
+def new_control(desk, budget, stats):
+  # no budget splits by the entry count, DESK_NUM_MAX and DESK_NUM_MIN,
+  # and search.MEMORY_BUDGET beyond; a budget given is kept to
+  key_bytes = sys.getsizeof(get_pile_key(desk))
+  if budget is None:
+    return search.FrontierControl(key_bytes, search.MEMORY_BUDGET, stats,
+                                  least=DESK_NUM_MAX, keep=DESK_NUM_MIN)
+  return search.FrontierControl(key_bytes, budget, stats)
+
+def get_solution(desk, path=None, interval=search.CHECKPOINT_TIME, stats=None,
+                 budget=None, watch=None, vectorized=False, external=None):
+  # path: a checkpoint file written every interval seconds, see resume_solution
+  # budget: the bytes the frontier and the done-tables may take, see new_control
+  # watch: function(entries) called every layer, raises search.Cancelled
+  #        when it returns True
+  # vectorized: expand the layers with test_moves_numpy
+  # external: keep the done-tables in this directory, see ExternalDone;
+  #           True for a temporary one
+  checkpoint = search.Checkpoint(path, interval, stats)
+  control = new_control(desk, budget, checkpoint.stats)
+  if external:
+    external = ExternalDone(None if external is True else external, control.budget)
+    done = external.start(desk)
+  else:
+    done = {}
+  layers = Layers(desk, control, checkpoint, watch, vectorized, external)
+  entries = [([move], get_move_score(desk, move)) for move in get_moves(desk)]
+  return layers.run(layers.start(entries, done))
+
+def resume_solution(desk, path, interval=search.CHECKPOINT_TIME, stats=None,
+                    budget=None, watch=None, vectorized=False):
+  # continues the get_solution that wrote the checkpoint file,
+  # vectorized has to be the same, the files of an external search
+  # have to stay where they were
+  checkpoint = search.Checkpoint(path, interval, stats)
+  control = new_control(desk, budget, checkpoint.stats)
+  layers = Layers(desk, control, checkpoint, watch, vectorized)
+  return layers.run(layers.load(path))
+
+# STATE of the search module: a desk, the goal is to fill the bases.
+# auto_move_to_bases is not applied, so a line plays one card per move
+# and the cards off the bases never overestimate the moves left.
+
+class State:
+  def __init__(self, desk):
+    self.desk = desk
+
+  def moves(self):
+    return get_moves(self.desk)
+
+  def apply(self, move):
+    move_card(self.desk, move)
+
+  def undo(self, move):
+    move_cards_reverse(self.desk, [move])
+
+  def replay(self, moves):
+    move_cards(self.desk, moves)
+
+  def rewind(self, moves):
+    move_cards_reverse(self.desk, moves)
+
+  def key(self):
+    return get_base_key(self.desk), get_pile_key(self.desk)
+
+  def is_goal(self):
+    return is_empty(self.desk)
+
+  def heuristic(self):
+    return CARD_NUM - count_base_cards(self.desk)
 
 if _debug:
   x = new_desk()
@@ -1,5 +1,19 @@
 import random
 import itertools
+import math
+import mmap
+import operator
+import os
+
+import search
+from search import Stats
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+_debug = __name__ == '__main__'
 
 # Directions
 UP    = 0
@@ -27,7 +41,7 @@ class CornerCell(Cell):
 
 class EdgeCell(Cell):
 	pass
-	
+
 class Face:
 	def __init__(self, color):
 		self.color = color
@@ -73,16 +87,12 @@ class Face:
 				return False
 		return True
 
-	def getKey(self, key):
-		#~ key |= (self.color + 1)
-		#~ key <<= 3
-		for e in self.edges:
-			key |= (e.color + 1)
-			key <<= 3
-		for c in self.corners:
-			key |= (c.color + 1)
-			key <<= 3
-		return key
+	def getCells(self):
+		""" the cells row by row, the centre is None """
+		return [
+			self.corners[LEFT], self.edges[UP],   self.corners[UP],
+			self.edges[LEFT],   None,             self.edges[RIGHT],
+			self.corners[DOWN], self.edges[DOWN], self.corners[RIGHT]]
 
 # cube sides
 F = 0  # Front
@@ -93,34 +103,21 @@ L = 4  # Left
 R = 5  # Right
 FACE_NUM = 6
 
-cube = [Face(color) for color in range(FACE_NUM)]
+layout = [
+  [U, R, D, L],  # Front
+  [L, D, R, U],  # Back
+  [F, L, B, R],  # Up
+  [R, B, L, F],  # Down
+  [B, U, F, D],  # Left
+  [D, F, U, B],  # Right
+]
 
-def isSolved(cube):
-	for f in cube:
-		if not f.isSolved():
-			return False
-	return True
-
-def getKey(cube):
-	#~ keys = set()
-	#~ for mask in itertools.permutations(range(1, FACE_NUM + 1)):
-	key = 0
-	for f in cube:
-		key = f.getKey(key)
-
-	# normalize
-	mask = []
-	key_norm = 0
-	while key:
-		n = (key & 7)
-		key >>= 3
-		if n not in mask:
-			mask.append(n)
-		key_norm |= (mask.index(n) + 1)
-		key_norm <<= 3
-		#~ keys.add(k)
-	#~ assert(len(keys) == 720)	# 6!
-	return key_norm
+def new_faces():
+	""" the cube as a graph of connected faces """
+	faces = [Face(color) for color in range(FACE_NUM)]
+	for f in range(FACE_NUM):
+		faces[f].neighbours = [faces[n] for n in layout[f]]
+	return faces
 
 MOVES = [
 	(F, True), (F, False),
@@ -130,185 +127,531 @@ MOVES = [
 	(L, True), (L, False),
 	(R, True), (R, False)]
 
-done = set()
+ROW_NUM = 3
+COL_NUM = 3
 
-def nextMove(cube, moves):
+SIDE_NUM = ROW_NUM * COL_NUM  # Number of elements in one side
+CUBE_SIZE = FACE_NUM * SIDE_NUM
+
+# Flat CUBE is a string of CUBE_SIZE stickers, side by side, row by row.
+# Every sticker is chr(its place on the solved cube), so the color of
+# a sticker is ord(sticker) // SIDE_NUM.
+SOLVED = ''.join(chr(i) for i in range(CUBE_SIZE))
+
+# translate() table: sticker -> color
+COLORS = ''.join(chr(i // SIDE_NUM) for i in range(CUBE_SIZE)).ljust(256, '\0')
+
+def get_cube_side(cube, side_name):
+	start = side_name * SIDE_NUM
+	return cube[start: start + SIDE_NUM]
+
+def make_turn(move):
+	""" reads the places of a move off a labelled face graph """
+	faces = new_faces()
+	for f in faces:
+		for i, cell in enumerate(f.getCells()):
+			if cell:
+				cell.color = f.color * SIDE_NUM + i
+
+	faces[move[0]].rotate(move[1])
+
+	places = []
+	for f in faces:
+		for i, cell in enumerate(f.getCells()):
+			places.append(cell.color if cell else f.color * SIDE_NUM + i)
+	return places
+
+# move -> the sticker permutation
+TURN_PLACES = dict((m, make_turn(m)) for m in MOVES)
+TURNS = dict((m, operator.itemgetter(*p)) for m, p in TURN_PLACES.items())
+
+def turn(cube, move):
+	return ''.join(TURNS[move](cube))
+
+def turn_all(cube, moves):
+	for m in moves:
+		cube = ''.join(TURNS[m](cube))
+	return cube
+
+def scramble(n):
+	""" returns n random moves """
+	return [random.choice(MOVES) for x in range(n)]
+
+def inverse(moves):
+	""" the moves that undo the given ones """
+	return [(face, not clockwise) for face, clockwise in moves[::-1]]
+
+def is_redundant(last, move):
+	""" True if another sequence of the same length or less does as well """
+	if move[0] == last[0]:
+		# undoing the last move, or two counter clockwise turns
+		# instead of two clockwise ones
+		return move[1] != last[1] or not move[1]
+	# the turns of the opposite faces commute, keep one order of them
+	return move[0] == last[0] ^ 1 and move[0] < last[0]
+
+# the last move -> the moves worth trying after it
+NEXT_MOVES = dict((last, [m for m in MOVES if not is_redundant(last, m)]) for last in MOVES)
+NEXT_MOVES[None] = MOVES
+
+def find_cubies():
+	""" groups the places of the stickers by the faces that turn them """
+	cubies = {}
+	for p in range(CUBE_SIZE):
+		faces = frozenset(m[0] for m in MOVES if turn(SOLVED, m)[p] != SOLVED[p])
+		if faces:
+			cubies.setdefault(faces, []).append(p)
+	corners = sorted(tuple(c) for f, c in cubies.items() if len(f) == 3)
+	edges = sorted(tuple(c) for f, c in cubies.items() if len(f) == 2)
+	return corners, edges
+
+CORNERS, EDGES = find_cubies()
+
+# one sticker tells both the cubie in a place and the way it is turned
+KEY_PLACES = [c[0] for c in CORNERS + EDGES]
+
+# the cells of a side by the directions of the sides their cubies touch
+CELL_DIRECTIONS = [
+	(LEFT, UP), (UP,),   (UP, RIGHT),
+	(LEFT,),    (),      (RIGHT,),
+	(DOWN, LEFT), (DOWN,), (RIGHT, DOWN)]
+
+NORMALS = [(0, 0, 1), (0, 0, -1), (0, 1, 0), (0, -1, 0), (-1, 0, 0), (1, 0, 0)]
+
+def find_points():
+	""" the point in space of every sticker """
+	points = []
+	for f in range(FACE_NUM):
+		for directions in CELL_DIRECTIONS:
+			v = [3 * x for x in NORMALS[f]]
+			for d in directions:
+				v = [x + 2 * y for x, y in zip(v, NORMALS[layout[f][d]])]
+			points.append(tuple(v))
+	return points
+
+def make_symmetries(mirrors):
+	"""
+	Returns a (translate() table, key places) pair for every way to turn
+	(and mirror) the whole cube. Looking at a cube from another side does not
+	change the number of moves it needs.
+	"""
+	points = find_points()
+	places = dict((v, i) for i, v in enumerate(points))
+	symmetries = []
+	for axes in itertools.permutations(range(3)):
+		for signs in itertools.product((1, -1), repeat=3):
+			det = signs[0] * signs[1] * signs[2]
+			for i in range(3):
+				for j in range(i):
+					if axes[j] > axes[i]:
+						det = -det
+			if det < 0 and not mirrors:
+				continue
+			# sticker place -> its place on the turned cube
+			image = [places[tuple(signs[k] * v[axes[k]] for k in range(3))] for v in points]
+			back = [0] * CUBE_SIZE
+			for i, n in enumerate(image):
+				back[n] = i
+			table = ''.join(chr(n) for n in image).ljust(256, '\0')
+			symmetries.append((table, operator.itemgetter(*[back[p] for p in KEY_PLACES])))
+	return symmetries
+
+ROTATIONS = make_symmetries(False)
+SYMMETRIES = make_symmetries(True)
+
+KEY_GETTER = operator.itemgetter(*KEY_PLACES)
+
+def isSolved(cube):
+	return cube == SOLVED
+
+def getKey(cube, symmetries=None):
+	"""
+	Returns a string of one sticker per cubie. With symmetries, the cubes
+	that are the same cube looked at from another side get the same key.
+	"""
+	if not symmetries:
+		return ''.join(KEY_GETTER(cube))
+	return min(''.join(places(cube.translate(table))) for table, places in symmetries)
+
+# PACKED moves are defined as:
+# an int of 4 bits a move, MOVES.index(move) + 1, the last move lowest
+
+def pack_moves(moves, packed=0):
+	for m in moves:
+		packed = (packed << 4) | (MOVES.index(m) + 1)
+	return packed
+
+def unpack_moves(packed):
+	moves = []
+	while packed:
+		moves.append(MOVES[(packed & 15) - 1])
+		packed >>= 4
+	return moves[::-1]
+
+# the last 4 bits of packed moves -> (move, its 4 bits) worth trying next
+NEXT_CODES = [[(m, MOVES.index(m) + 1) for m in NEXT_MOVES[MOVES[code - 1] if code else None]]
+	for code in range(len(MOVES) + 1)]
+
+def nextMove(cube, packed, done, symmetries=None):
+	""" returns the packed solution or None, and the (cube, packed) after """
 	solution = None
 	next_moves = []
-	for m in MOVES:
-		cube[m[0]].rotate(m[1])
-		key = getKey(cube)
+	for m, code in NEXT_CODES[packed & 15]:
+		c = turn(cube, m)
+		key = getKey(c, symmetries)
 		if key not in done:
 			done.add(key)
-			n = moves[:]
-			n.append(m)
-			next_moves.append(n)
-			if isSolved(cube):
+			n = (packed << 4) | code
+			next_moves.append((c, n))
+			if isSolved(c):
 				solution = n
-		cube[m[0]].rotate(not m[1])  # restore
 	return solution, next_moves
 
-def solve(cube):
-	key = getKey(cube)
-	solution, next_moves = nextMove(cube, [])
-	while not solution:
-		print len(next_moves[0]), len(next_moves), len(done)
-		accum = []
-		for moves in next_moves:
-			for m in moves:
-				cube[m[0]].rotate(m[1])
+class Layers(search.Layers):
+	""" the layers of solve; the frontier is never split, so the solution is the shortest """
+	def __init__(self, cube, symmetries, checkpoint):
+		search.Layers.__init__(self, None, checkpoint)
+		self.cube = cube
+		self.symmetries = symmetries
+
+	def header(self):
+		return self.cube, len(self.symmetries or [])
 
-			s, n = nextMove(cube, moves)
+	def expand(self, next_moves, done, solution):
+		if _debug:
+			print self.stats.depth, len(next_moves), len(done)
+		accum = []
+		for c, packed in next_moves:
+			s, n = nextMove(c, packed, done, self.symmetries)
 			accum += n
-			if s:
+			if s is not None:
 				solution = s
-
-			for m in moves[::-1]:	#restore
-				cube[m[0]].rotate(not m[1])
-
-			assert(key == getKey(cube))
-		next_moves = accum
-	return solution
-
-# connect faces
-cube[F].neighbours = [cube[U], cube[R], cube[D], cube[L]]
-cube[B].neighbours = [cube[L], cube[D], cube[R], cube[U]]
-cube[U].neighbours = [cube[F], cube[L], cube[B], cube[R]]
-cube[D].neighbours = [cube[R], cube[B], cube[L], cube[F]]
-cube[L].neighbours = [cube[B], cube[U], cube[F], cube[D]]
-cube[R].neighbours = [cube[D], cube[F], cube[U], cube[B]]
-
-def print_cube(c):
-	for f in c:
-		print f.corners[LEFT].color, ',', f.edges[UP].color, ',', f.corners[UP].color
-		print f.edges[LEFT].color, ',', f.color, ',', f.edges[RIGHT].color
-		print f.corners[DOWN].color, ',', f.edges[DOWN].color, ',', f.corners[RIGHT].color
-		print "----"
-		
-print_cube(cube)
-print(isSolved(cube), getKey(cube))
-
-moves = []
-for x in range(17):
-	face = random.randint(0, FACE_NUM - 1)
-	clockwise = (random.randint(0, 1) > 0)
-	cube[face].rotate(clockwise)
-
+		if solution is not None:
+			accum = []  # no shorter solution is left
+		return solution, accum, done
+
+def solve(cube, symmetries=None, path=None, interval=search.CHECKPOINT_TIME, stats=None):
+	"""
+	Breadth-first search. Symmetries (ROTATIONS or SYMMETRIES) shrink
+	the done set, but cost a key per symmetry; they pay off near SOLVED.
+	The search is written to the path every interval seconds, see resume.
+	"""
 	if isSolved(cube):
-		print "APOJ!"
-
-	moves.insert(0, (face, not clockwise))
-	
-print "+"*8
-print_cube(cube)
-print(isSolved(cube), getKey(cube))
-print(solve(cube))
-
-for m in moves:
-	cube[m[0]].rotate(m[1])
-print(isSolved(cube), getKey(cube))
-
-print "+"*8
-print_cube(cube)
-
-#~ cube[L].rotate(True)
-#~ print "+"*8
-#~ print_cube(cube)
-#~ 
-#~ cube[R].rotate(False)
-#~ print "+"*8
-#~ print_cube(cube)
-#~ 
-#~ cube[F].rotate(False)
-#~ print "+"*8
-#~ print_cube(cube)
-
-layout = [
-  [U, R, D, L],  # Front
-  [L, D, R, U],  # Back
-  [F, L, B, R],  # Up
-  [R, B, L, F],  # Down
-  [B, U, F, D],  # Left
-  [D, F, U, B],  # Right
+		return []
+	layers = Layers(cube, symmetries, search.Checkpoint(path, interval, stats))
+	done = set([getKey(cube, symmetries)])
+	solution, next_moves = nextMove(cube, 0, done, symmetries)
+	return unpack_layers(layers.run(layers.start(next_moves, done, solution)))
+
+def resume(cube, path, symmetries=None, interval=search.CHECKPOINT_TIME, stats=None):
+	""" continues the solve that wrote the checkpoint file """
+	layers = Layers(cube, symmetries, search.Checkpoint(path, interval, stats))
+	return unpack_layers(layers.run(layers.load(path)))
+
+def unpack_layers(solution):
+	return unpack_moves(solution) if solution is not None else None
+
+def get_layer_keys(layer):
+	""" the getKey of every cube of a (N x CUBE_SIZE) array, as N-array """
+	keys = numpy.ascontiguousarray(layer[:, KEY_PLACES])
+	return keys.view(numpy.dtype((numpy.void, len(KEY_PLACES)))).ravel()
+
+def solve_numpy(cube):
+	"""
+	Breadth-first search like solve, a layer at a time with numpy: the layer
+	is a (N x CUBE_SIZE) array that every move turns in one indexing.
+	"""
+	if numpy is None:
+		raise ImportError("solve_numpy needs numpy")
+	if isSolved(cube):
+		return []
+
+	places = numpy.array([TURN_PLACES[m] for m in MOVES], numpy.intp)
+	# [the index of the last move or len(MOVES)][move index] -> worth trying
+	allowed = numpy.array([[m in NEXT_MOVES[last] for m in MOVES]
+		for last in MOVES + [None]], bool)
+	solved = numpy.frombuffer(SOLVED, numpy.uint8)
+
+	layer = numpy.frombuffer(cube, numpy.uint8).reshape(1, CUBE_SIZE)
+	last = numpy.array([len(MOVES)], numpy.intp)
+	done = get_layer_keys(layer)
+	history = []  # per layer: (index of the parent, index of the move)
+
+	while len(layer):
+		n = len(layer)
+		parents = numpy.repeat(numpy.arange(n), len(MOVES))
+		moves = numpy.tile(numpy.arange(len(MOVES)), n)
+		ok = allowed[last[parents], moves]
+		parents, moves = parents[ok], moves[ok]
+
+		children = layer[parents[:, None], places[moves]]
+		keys, first = numpy.unique(get_layer_keys(children), return_index=True)
+
+		# drop the cubes done before
+		i = numpy.searchsorted(done, keys)
+		new = done[numpy.minimum(i, len(done) - 1)] != keys
+		first = first[new]
+
+		layer = children[first]
+		last = moves[first]
+		history.append((parents[first], last))
+		done = numpy.sort(numpy.concatenate((done, keys[new])))
+
+		hits = numpy.flatnonzero((layer == solved).all(axis=1))
+		if len(hits):
+			k = hits[0]
+			solution = []
+			for parents, moves in history[::-1]:
+				solution.append(MOVES[moves[k]])
+				k = parents[k]
+			return solution[::-1]
+	return None
+
+def get_path(visited, cube):
+	""" the moves from the root of the search to the cube """
+	moves = []
+	while visited[getKey(cube)]:
+		m = visited[getKey(cube)]
+		moves.append(m)
+		cube = turn(cube, (m[0], not m[1]))
+	return moves[::-1]
+
+BIDIRECTIONAL_MAX = 4000000  # cubes kept by both searches
+
+def solve_bidirectional(cube, size=BIDIRECTIONAL_MAX):
+	""" meets a search from the cube with one from the solved cube """
+	if isSolved(cube):
+		return []
+
+	# No symmetries here: the two searches must agree on the very cube they
+	# meet at. getKey(cube) -> the last move to it, None for the roots
+	sides = [{getKey(cube): None}, {getKey(SOLVED): None}]
+	# (cube, the last move to it)
+	layers = [[(cube, None)], [(SOLVED, None)]]
+
+	meet = None
+	while meet is None:
+		if len(sides[0]) + len(sides[1]) > size:
+			return None
+
+		# grow the smaller layer
+		i = 0 if len(layers[0]) <= len(layers[1]) else 1
+		visited, other = sides[i], sides[1 - i]
+
+		layer = []
+		length = None
+		for c, last in layers[i]:
+			for m in NEXT_MOVES[last]:
+				n = turn(c, m)
+				key = getKey(n)
+				if key not in visited:
+					visited[key] = m
+					layer.append((n, m))
+					if key in other:
+						k = len(get_path(other, n))
+						if meet is None or k < length:
+							meet, length = n, k
+		if not layer:
+			return None
+		layers[i] = layer
+
+	forward, backward = sides
+	return get_path(forward, meet) + inverse(get_path(backward, meet))
+
+def make_labels(label):
+	""" translate() table: sticker -> label(cubie, index of the sticker) """
+	table = ['\0'] * 256
+	for cubies in (CORNERS, EDGES):
+		for i, cubie in enumerate(cubies):
+			for j, p in enumerate(cubie):
+				table[p] = chr(label(cubies, i, j))
+	return ''.join(table)
+
+def is_marked(cubies, i, j):
+	""" marks the U/D sticker of a cubie, or the F/B one if there is none """
+	colors = [p // SIDE_NUM for p in cubies[i]]
+	for pair in ((U, D), (F, B)):
+		for c in colors:
+			if c in pair:
+				return colors[j] == c
+	return False
+
+def orientation_index(marks, width):
+	n = 0
+	for i in range(0, len(marks), width):
+		n = n * width + marks[i:i + width].index('\1')
+	return n
+
+def permutation_index(items):
+	n = 0
+	for i, x in enumerate(items):
+		n = n * (len(items) - i) + sum(1 for y in items[i + 1:] if y < x)
+	return n
+
+EDGE_GROUP = 4  # edges tracked by an edge pattern
+
+def group_index(labels):
+	places = [0] * EDGE_GROUP
+	for k, n in enumerate(labels):
+		n = ord(n)
+		if n:
+			t, o = divmod(n - 1, 2)
+			places[t] = k * 2 + o
+	n = 0
+	for x in places:
+		n = n * len(EDGES) * 2 + x
+	return n
+
+CORNER_PLACES = operator.itemgetter(*[p for c in CORNERS for p in c])
+EDGE_PLACES = operator.itemgetter(*[p for c in EDGES for p in c])
+CORNER_FIRSTS = operator.itemgetter(*[c[0] for c in CORNERS])
+EDGE_FIRSTS = operator.itemgetter(*[c[0] for c in EDGES])
+
+def edge_group(group):
+	def label(cubies, i, j):
+		t = i - group * EDGE_GROUP
+		if cubies is EDGES and 0 <= t < EDGE_GROUP:
+			return 1 + 2 * t + j
+		return 0
+	return label
+
+# PATTERN is defined as:
+# (name, translate() table that keeps the pattern, index of a pattern, size)
+PATTERNS = [
+	('corner_orientation',
+		make_labels(lambda cubies, i, j: cubies is CORNERS and is_marked(cubies, i, j)),
+		lambda c: orientation_index(CORNER_PLACES(c), 3), 3 ** len(CORNERS)),
+	('edge_orientation',
+		make_labels(lambda cubies, i, j: cubies is EDGES and is_marked(cubies, i, j)),
+		lambda c: orientation_index(EDGE_PLACES(c), 2), 2 ** len(EDGES)),
+	('corner_permutation',
+		make_labels(lambda cubies, i, j: cubies is CORNERS and i + 1),
+		lambda c: permutation_index(CORNER_FIRSTS(c)), math.factorial(len(CORNERS))),
 ]
+for group in range(len(EDGES) // EDGE_GROUP):
+	PATTERNS.append(('edges_%d' % group, make_labels(edge_group(group)),
+		lambda c: group_index(EDGE_FIRSTS(c)), (len(EDGES) * 2) ** EDGE_GROUP))
+
+PDB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb')
+PDB_UNKNOWN = 15
+
+def build_pdb(pattern, path=PDB_PATH):
+	"""
+	Writes the distances of all the cubes of the pattern to SOLVED,
+	two distances per byte.
+	"""
+	name, labels, index, size = pattern
+	table = bytearray('\xff' * ((size + 1) // 2))
+
+	def get(i):
+		return (table[i >> 1] >> ((i & 1) << 2)) & 15
+
+	def put(i, n):
+		shift = (i & 1) << 2
+		table[i >> 1] = (table[i >> 1] & ~(15 << shift)) | (n << shift)
+
+	layer = [SOLVED.translate(labels)]
+	put(index(layer[0]), 0)
+	depth = 0
+	while layer:
+		depth += 1
+		assert(depth < PDB_UNKNOWN)
+		accum = []
+		for c in layer:
+			for m in MOVES:
+				n = turn(c, m)
+				i = index(n)
+				if get(i) == PDB_UNKNOWN:
+					put(i, depth)
+					accum.append(n)
+		layer = accum
+
+	if not os.path.isdir(path):
+		os.makedirs(path)
+	file_name = os.path.join(path, name + '.pdb')
+	f = open(file_name + '.tmp', 'wb')
+	f.write(table)
+	f.close()
+	os.rename(file_name + '.tmp', file_name)
+	return file_name
+
+def build_pdbs(path=PDB_PATH):
+	return [build_pdb(p, path) for p in PATTERNS]
+
+def load_pdbs(path=PDB_PATH):
+	""" maps the pattern files, every process shares the same pages """
+	pdbs = []
+	for name, labels, index, size in PATTERNS:
+		f = open(os.path.join(path, name + '.pdb'), 'rb')
+		table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		f.close()
+		pdbs.append((labels, index, table))
+	return pdbs
+
+def estimate(cube, pdbs):
+	""" the least number of moves the cube needs by the patterns """
+	h = 0
+	for labels, index, table in pdbs:
+		i = index(cube.translate(labels))
+		n = (ord(table[i >> 1]) >> ((i & 1) << 2)) & 15
+		if n > h:
+			h = n
+	return h
+
+IDA_TABLE_MAX = 1000000  # cubes kept by solve_ida between bound changes
+
+class State:
+	""" a cube for the search module """
+	def __init__(self, cube, pdbs=None):
+		self.cube = cube
+		self.pdbs = pdbs
+		self.history = []  # (cube, move) before every move
+
+	def moves(self):
+		return NEXT_MOVES[self.history[-1][1] if self.history else None]
+
+	def apply(self, move):
+		self.history.append((self.cube, move))
+		self.cube = turn(self.cube, move)
+
+	def undo(self, move):
+		self.cube = self.history.pop()[0]
+
+	def key(self):
+		return getKey(self.cube)
+
+	def is_goal(self):
+		return isSolved(self.cube)
+
+	def heuristic(self):
+		return estimate(self.cube, self.pdbs) if self.pdbs else 0
+
+def solve_ida(cube, pdbs, stats=None):
+	""" iterative deepening A* with the pattern databases """
+	return search.ida(State(cube, pdbs), stats, IDA_TABLE_MAX)
 
-#~ print layout
-
-def RotateFace(face_name, clockwise=True):
-	order = layout[face_name][:]
-	print order
-	cells = []
-
-	for d in range(NUM_OF_DIRECTIONS):
-		face = cube[order[d]]
-		cells.append((
-			face.corners[rotate(d, RIGHT)],
-			face.edges[rotate(d, DOWN)],
-			face.corners[rotate(d, DOWN)]
-		))
-		
-	if clockwise:
-		order.append(order.pop(0))
-	else:
-		order.insert(0, order.pop(-1))
-
-	for d in range(NUM_OF_DIRECTIONS):
-		face = cube[order[d]]
-		face.corners[rotate(d, RIGHT)] = cells[d][0]
-		face.edges[rotate(d, DOWN)]    = cells[d][1]
-		face.corners[rotate(d, DOWN)]  = cells[d][2]
-
-
-#~ print "!"
-#~ RotateFace(F)
-#~ print_cube(cube)
-#~ print "!"
-#~ RotateFace(F)
-#~ print_cube(cube)
-#~ print "!"
-#~ RotateFace(F)
-#~ print_cube(cube)
-#~ print "!"
-#~ RotateFace(F)
-#~ print_cube(cube)
-
-
-ROW_NUM = 3
-COL_NUM = 3
-
-SIDE_NUM = ROW_NUM * COL_NUM  # Number of elements in one side
-
-cube = []
-for color in range(FACE_NUM):
-	cube += [color] * SIDE_NUM
-print cube
-
-def get_cube_side(cube, side_name):
-	start = side_name * SIDE_NUM
-	return cube[start: start + SIDE_NUM]
-
-#~ print get_cube_side(cube, B)
-#~ print get_cube_side(cube, L)
-#~ print get_cube_side(cube, R)
-
-def rotate(cube, side_name, clockwise=True):
-	pattern = (6,3,0,
-	           7,4,1,
-	           8,5,2)
-	side = get_cube_side(cube, side_name)
-	start = side_name * SIDE_NUM
+def print_cube(c):
+	for f in range(FACE_NUM):
+		side = get_cube_side(c.translate(COLORS), f)
+		for row in range(ROW_NUM):
+			print ' , '.join(str(ord(n)) for n in side[row * COL_NUM: (row + 1) * COL_NUM])
+		print "----"
 
-	# rotate the side
-	for i in range(SIDE_NUM):
-		cube[start + i] = side[pattern[i if clockwise else -1 - i]]
+if __name__ == '__main__':
+	cube = SOLVED
+	print_cube(cube)
+	print(isSolved(cube))
 
-	# and its neighbours
-	neighbours = layout[side_name]
-	#~ 
-	
+	moves = scramble(12)
+	cube = turn_all(cube, moves)
 
-#~ rotate(cube, F)
-#~ rotate(cube, R, False)
+	print "+"*8
+	print_cube(cube)
+	print(isSolved(cube))
+	print(solve_bidirectional(cube))
 
-#~ print cube
+	cube = turn_all(cube, inverse(moves))
+	print(isSolved(cube))
 
+	print "+"*8
+	print_cube(cube)
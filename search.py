@@ -0,0 +1,544 @@
+"""
+Search strategies shared by the solvers.
+
+Layers is the breadth-first search of the layered solvers, a game
+subclasses it with the expansion of a layer. beam(), best_first() and ida()
+take a STATE object that is changed in place:
+
+  state.moves()      the moves worth trying
+  state.apply(move)
+  state.undo(move)   reverts state.apply(move)
+  state.key()        hashable, equal for the states that play the same
+  state.is_goal()
+  state.heuristic()  the lower the closer to the goal; for ida() it must
+                     never exceed the number of moves left
+
+and optionally state.replay(line) and state.rewind(line), which apply and
+undo a whole line faster than move by move.
+
+A LINE is the list of moves from the state the search started at. beam()
+and best_first() replay every line from there, so states are never copied,
+and rank the lines by an EVALUATOR, function(state, line) with the state at
+the end of the line, the higher the better.
+"""
+
+import cPickle
+import heapq
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+CHECKPOINT_TIME = 600  # seconds between checkpoints
+
+MEMORY_BUDGET = 8 * 1024 * 1024  # bytes a layered search aims at, see FrontierControl
+SLOT_BYTES = 40      # a set or dict slot, besides the key itself
+SAMPLE_SIZE = 16     # entries measured to size a frontier
+SPLIT_SHARE = 4      # a split keeps this share of the room left
+RESERVE_SHARE = 4    # the reserve is spilled beyond this share of the budget
+
+
+class Cancelled(Exception):
+    """ raised by a search whose watch function asked it to stop """
+
+
+class Stats:
+    def __init__(self):
+        self.nodes = 0     # states expanded
+        self.dups = 0      # states rejected by the transposition table
+        self.depth = 0     # the deepest layer, or the last ida bound
+        self.frontier = 0  # the largest frontier
+        self.checkpoints = 0       # checkpoints written
+        self.checkpoint_time = 0.0  # seconds spent writing them
+        self.checkpoint_bytes = 0  # the size of the last one
+        self.splits = 0    # frontiers split by FrontierControl
+        self.spills = 0    # reserved frontiers written to disk
+        self.memory = 0    # the last estimate of the bytes held
+        self.peak_memory = 0
+
+
+class TranspositionTable:
+    """ key -> the shortest line length the state was reached with """
+
+    def __init__(self, size=None):
+        self.size = size
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, key):
+        return key in self.table
+
+    def visit(self, key, depth=0):
+        """ returns False if the state was reached before, no deeper """
+        n = self.table.get(key)
+        if n is not None and n <= depth:
+            return False
+        if n is None and self.size and len(self.table) >= self.size:
+            self.table.clear()  # start over rather than run out of memory
+        self.table[key] = depth
+        return True
+
+
+class Checkpoint:
+    """
+    Writes the state of a long search to a file from time to time, so a
+    killed search can be resumed. The state is pickled as a whole, the
+    objects shared within it stay shared when it is loaded.
+    """
+
+    def __init__(self, path=None, interval=CHECKPOINT_TIME, stats=None):
+        self.path = path
+        self.interval = interval
+        self.stats = stats if stats is not None else Stats()
+        self.saved = time.time()
+
+    def is_due(self):
+        return self.path is not None and time.time() - self.saved >= self.interval
+
+    def save(self, data):
+        """ writes the checkpoint atomically """
+        start = time.time()
+        tmp = self.path + '.tmp'
+        f = open(tmp, 'wb')
+        cPickle.dump(data, f, cPickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.rename(tmp, self.path)
+
+        self.saved = time.time()
+        self.stats.checkpoints += 1
+        self.stats.checkpoint_time += self.saved - start
+        self.stats.checkpoint_bytes = os.path.getsize(self.path)
+
+    @staticmethod
+    def load(path):
+        f = open(path, 'rb')
+        data = cPickle.load(f)
+        f.close()
+        return data
+
+
+class Spilled:
+    """ the entries of a reserved frontier written to a file """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        f = open(self.path, 'rb')
+        entries = cPickle.load(f)
+        f.close()
+        return entries
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class FrontierControl:
+    """
+    Decides when a layered search splits its frontier. The decision is made
+    by the approximate bytes of the frontier, the done-table and the reserve
+    rather than by the number of entries, so deep lines and large tables
+    split early and the search stays within the memory budget.
+
+    RESERVE is a stack of (bytes, entries, rest) kept by the search; the
+    entries that do not fit in memory are replaced by Spilled files, the
+    rest (the done-table the entries go on with) stays in memory. A file
+    loaded back is kept until release(), as a checkpoint may still list it.
+
+    The budget trades the quality of the solutions for speed and memory:
+    a split part is searched deeper before the rest, so the earlier the
+    splits, the longer the solutions. The solvers split by the entry count
+    at their default budget, passing their DESK_NUM_MAX and DESK_NUM_MIN as
+    least and keep, and a frontier of DESK_NUM_MAX entries may take more
+    than the budget. With least=0 the budget is kept to: FreeCell deals 1-3
+    take a few times less time and memory, but longer solutions.
+    """
+
+    def __init__(self, key_bytes, budget=MEMORY_BUDGET, stats=None, spill_dir=None,
+                 least=0, keep=1):
+        """
+        :param least: entries a frontier is never split below
+        :param keep: entries a split keeps at least
+        """
+        self.key_bytes = key_bytes + SLOT_BYTES
+        self.budget = budget
+        self.least = least
+        self.keep = keep
+        self.stats = stats if stats is not None else Stats()
+        self.spill_dir = spill_dir  # a temporary directory by default
+        self.dirs = set()  # the temporary directories to remove once empty
+        self.loaded = []   # the Spilled files popped since release()
+        self.growth = 1.0  # the size of a layer by the size of the one before
+        self.last = None
+
+    def frontier_bytes(self, entries):
+        """ the entries with their move lists, estimated by a sample """
+        if not entries:
+            return 0
+        step = max(1, len(entries) // SAMPLE_SIZE)
+        sample = entries[::step]
+        n = 0
+        for entry in sample:
+            n += sys.getsizeof(entry) + sum(sys.getsizeof(x) for x in entry)
+        return n * len(entries) // len(sample)
+
+    def reserve_bytes(self, reserve):
+        return sum(size for size, entries, rest in reserve if not isinstance(entries, Spilled))
+
+    def split_size(self, entries, keys, reserve):
+        """
+        :param keys: the number of keys in the done-table
+        :return the number of entries to keep, or None to keep them all:
+        """
+        if self.last:
+            self.growth = max(1.0, float(len(entries)) / self.last)
+        self.last = len(entries)
+
+        frontier = self.frontier_bytes(entries)
+        held = keys * self.key_bytes + self.reserve_bytes(reserve)
+        self.stats.memory = frontier + held
+        self.stats.peak_memory = max(self.stats.peak_memory, self.stats.memory)
+
+        # the next layer has to fit as well; the done-table is not shrunk,
+        # so once it outgrows the budget the frontier keeps a share of it
+        room = max(self.budget - held, self.budget // SPLIT_SHARE)
+        if frontier * (1 + self.growth) <= room or len(entries) <= max(1, self.least):
+            return None
+
+        self.stats.splits += 1
+        n = len(entries) * room // (frontier * (1 + self.growth) * SPLIT_SHARE)
+        self.last = min(max(1, self.keep, n), len(entries) - 1)
+        return self.last
+
+    def push(self, reserve, entries, rest=None):
+        """ puts entries aside, the oldest go to disk if need be """
+        reserve.append((self.frontier_bytes(entries), entries, rest))
+
+        for i, (size, old, old_rest) in enumerate(reserve):
+            if self.reserve_bytes(reserve) <= self.budget // RESERVE_SHARE:
+                break
+            if isinstance(old, Spilled):
+                continue
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix='spill')
+                self.dirs.add(self.spill_dir)
+            fd, path = tempfile.mkstemp(dir=self.spill_dir)
+            f = os.fdopen(fd, 'wb')
+            cPickle.dump(old, f, cPickle.HIGHEST_PROTOCOL)
+            f.close()
+            reserve[i] = (size, Spilled(path), old_rest)
+            self.stats.spills += 1
+
+    def pop(self, reserve):
+        """ returns the entries put aside last and their rest """
+        size, entries, rest = reserve.pop()
+        self.last = None
+        if isinstance(entries, Spilled):
+            self.dirs.add(os.path.dirname(entries.path))
+            self.loaded.append(entries)
+            entries = entries.load()
+        return entries, rest
+
+    def release(self):
+        """ removes the files popped, once no checkpoint lists them """
+        for spilled in self.loaded:
+            spilled.remove()
+        self.loaded = []
+
+    def close(self, reserve):
+        """ removes the spill files of the parts the search gave up """
+        for size, entries, rest in reserve:
+            if isinstance(entries, Spilled):
+                self.dirs.add(os.path.dirname(entries.path))
+                entries.remove()
+        self.release()
+        for path in self.dirs:
+            if os.path.isdir(path) and not os.listdir(path):
+                os.rmdir(path)
+
+
+class Layers:
+    """
+    The layered search the solvers share. A frontier of ENTRIES is expanded
+    a layer at a time against a DONE-table. FrontierControl splits the
+    frontier that outgrows the memory budget: the part put aside goes to
+    the reserve with the done-table and the depth of the time, and it is
+    searched once the part kept runs dry.
+
+    A game subclasses it with expand() and whatever else it does its own
+    way; the state of a search is (entries, done, depth, reserve, solution).
+    """
+
+    first = True  # stop once a part of the frontier finds a solution
+
+    def __init__(self, control=None, checkpoint=None, watch=None):
+        """
+        :param control: FrontierControl, None never splits the frontier
+        :param checkpoint: Checkpoint to write the state to from time to time
+        :param watch: optional function(entries) called every layer, the
+                      search raises Cancelled when it returns True
+        """
+        self.control = control
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+        self.stats = self.checkpoint.stats
+        self.watch = watch
+
+    def expand(self, entries, done, solution):
+        """ returns the solution, the next layer and its done-table """
+        raise NotImplementedError
+
+    def split(self, entries, n):
+        """ returns the n entries to keep and the entries to put aside """
+        return entries[:n], entries[n:]
+
+    def keys(self, done):
+        """ the keys the done-table holds in memory """
+        return len(done)
+
+    def header(self):
+        """ saved with the checkpoints, tells the search they belong to """
+        return None
+
+    def memo(self):
+        """ saved with the checkpoints, given back to restore() """
+        return None
+
+    def restore(self, memo):
+        """ sets the search up as memo() found it """
+
+    def stepped_back(self, done, state):
+        """ called with the done-table of the part given up """
+
+    def close(self, reserve):
+        """ removes what the search keeps on disk """
+        if self.control is not None:
+            self.control.close(reserve)
+
+    def start(self, entries, done, solution=None):
+        return entries, done, 0, [], solution
+
+    def save(self, state):
+        control = self.control
+        trend = (control.growth, control.last) if control is not None else None
+        self.checkpoint.save((self.header(), state, trend, self.memo()))
+        if control is not None:
+            control.release()
+
+    def load(self, path):
+        """ returns the state of the checkpoint file to run() on from """
+        header, state, trend, memo = Checkpoint.load(path)
+        if header != self.header():
+            raise ValueError('%s belongs to another search' % path)
+        if self.control is not None:
+            self.control.growth, self.control.last = trend
+        self.restore(memo)
+        return state
+
+    def run(self, state):
+        """ returns the solution """
+        entries, done, depth, reserve, solution = state
+        control = self.control
+        stats = self.stats
+
+        while True:
+            while entries:
+                if self.watch is not None and self.watch(len(entries)):
+                    if self.checkpoint.path is None:  # otherwise kept for load()
+                        self.close(reserve)
+                    raise Cancelled()
+
+                if control is not None:
+                    n = control.split_size(entries, self.keys(done), reserve)
+                    if n is not None:
+                        entries, aside = self.split(entries, n)
+                        control.push(reserve, aside, (done, depth))
+
+                depth += 1
+                stats.nodes += len(entries)
+                stats.frontier = max(stats.frontier, len(entries))
+                stats.depth = max(stats.depth, depth)
+                solution, entries, done = self.expand(entries, done, solution)
+
+                if self.checkpoint.is_due():
+                    self.save((entries, done, depth, reserve, solution))
+
+            if (self.first and solution is not None) or not reserve:
+                break
+            given_up = done
+            entries, (done, depth) = control.pop(reserve)
+            if self.checkpoint.path is None:
+                control.release()
+            self.stepped_back(given_up, (entries, done, depth, reserve, solution))
+
+        # a finished search leaves its result to load()
+        if self.checkpoint.path is not None:
+            self.save((entries, done, depth, [], solution))
+        self.close(reserve)
+        return solution
+
+
+def replay(state, line):
+    if hasattr(state, 'replay'):
+        state.replay(line)
+    else:
+        for move in line:
+            state.apply(move)
+
+
+def rewind(state, line):
+    if hasattr(state, 'rewind'):
+        state.rewind(line)
+    else:
+        for move in reversed(line):
+            state.undo(move)
+
+
+def by_heuristic(state, line):
+    """ the default EVALUATOR: the closer to the goal the better """
+    return -state.heuristic()
+
+
+def by_cost(state, line):
+    """ the EVALUATOR of A*: the moves made and the moves left """
+    return -len(line) - state.heuristic()
+
+
+def beam(state, width, evaluate=by_heuristic, found=None, stats=None,
+         table_size=None):
+    """
+    Breadth-first search that keeps the width best lines of every layer.
+
+    :param evaluate: EVALUATOR of the lines
+    :param found: function(state, line) called at every goal and dead end,
+                  the search stops when it returns True; by default it
+                  stops at the first goal
+    :return the line the search stopped at, or None:
+    """
+    if stats is None:
+        stats = Stats()
+    if found is None:
+        found = lambda state, line: state.is_goal()
+    table = TranspositionTable(table_size)
+    table.visit(state.key())
+    layer = [[]]
+
+    while layer:
+        ranked = []
+        for line in layer:
+            replay(state, line)
+            stats.nodes += 1
+            moves = state.moves()
+            for move in moves:
+                state.apply(move)
+                new_line = line + [move]
+                if state.is_goal():
+                    if found(state, new_line):
+                        rewind(state, new_line)
+                        return new_line
+                elif table.visit(state.key(), len(new_line)):
+                    ranked.append((evaluate(state, new_line), new_line))
+                else:
+                    stats.dups += 1
+                state.undo(move)
+            if not moves and found(state, line):
+                rewind(state, line)
+                return line
+            rewind(state, line)
+
+        stats.frontier = max(stats.frontier, len(ranked))
+        layer = [line for rank, line in heapq.nlargest(width, ranked)]
+        if layer:
+            stats.depth += 1
+    return None
+
+
+def best_first(state, evaluate=by_heuristic, stats=None, table_size=None):
+    """
+    Expands the best line found so far first: greedy best-first with
+    by_heuristic, A* with by_cost.
+
+    :param evaluate: EVALUATOR of the lines
+    :return the line to the goal or None:
+    """
+    if stats is None:
+        stats = Stats()
+    table = TranspositionTable(table_size)
+    table.visit(state.key())
+    order = itertools.count()  # the oldest line first on ties
+    frontier = [(-evaluate(state, []), next(order), [])]
+
+    while frontier:
+        rank, n, line = heapq.heappop(frontier)
+        replay(state, line)
+        if state.is_goal():
+            rewind(state, line)
+            return line
+        stats.nodes += 1
+        stats.depth = max(stats.depth, len(line))
+
+        for move in state.moves():
+            state.apply(move)
+            new_line = line + [move]
+            if table.visit(state.key(), len(new_line)):
+                heapq.heappush(frontier, (-evaluate(state, new_line), next(order), new_line))
+            else:
+                stats.dups += 1
+            state.undo(move)
+        rewind(state, line)
+        stats.frontier = max(stats.frontier, len(frontier))
+    return None
+
+
+def ida(state, stats=None, table_size=None):
+    """
+    Iterative deepening A*; state.heuristic() must be admissible.
+
+    :return the line to the goal or None:
+    """
+    if stats is None:
+        stats = Stats()
+    line = []
+
+    def search(bound, table):
+        """ returns True once solved, or the least cost over the bound """
+        f = len(line) + state.heuristic()
+        if f > bound:
+            return f
+        if state.is_goal():
+            return True
+        stats.nodes += 1
+
+        least = None
+        for move in state.moves():
+            state.apply(move)
+            if table.visit(state.key(), len(line) + 1):
+                line.append(move)
+                t = search(bound, table)
+                if t is True:
+                    state.undo(move)
+                    return True
+                line.pop()
+                if t is not None and (least is None or t < least):
+                    least = t
+            else:
+                stats.dups += 1
+            state.undo(move)
+        return least
+
+    bound = state.heuristic()
+    while True:
+        stats.depth = bound
+        table = TranspositionTable(table_size)
+        table.visit(state.key())
+        t = search(bound, table)
+        if t is True:
+            return line
+        if t is None:
+            return None
+        bound = t
@@ -0,0 +1,383 @@
+"""
+Local solver service.
+
+A pool of worker processes is started once, with the solvers imported, and
+FreeCell and Tri Peaks deals are served over a Unix socket or a localhost TCP
+port. A request is one line:
+
+  <freecell|tripeaks> <seconds> <cascade> <cascade> ...
+
+with the cascades in the format of deal(). The answer is streamed back a line
+at a time:
+
+  queued <jobs waiting>
+  progress <layers> <entries>
+  solution <move> <move> ...
+  timeout | cancelled | error <message>
+
+A client cancels with a "cancel" line or by closing the connection; the
+worker stops at the next layer of its search. Identical deals share one
+search. A "stats" request returns the counters of the service.
+
+Usage:
+
+  python solver_service.py serve [address] [workers]
+  python solver_service.py solve [address] <game> <seconds> <cascade> ...
+  python solver_service.py stats [address]
+
+The address is a socket path or host:port, localhost:7500 by default.
+"""
+
+import itertools
+import multiprocessing
+import os
+import Queue
+import signal
+import socket
+import SocketServer
+import sys
+import threading
+import time
+
+import freecell_v1
+import search
+import tripeaks
+
+ADDRESS = 'localhost:7500'
+PROGRESS_TIME = 1.0  # seconds between progress lines of a job
+
+GAMES = {
+    'freecell': freecell_v1,
+    'tripeaks': tripeaks,
+}
+
+
+def parse_address(address):
+    if '/' in address:
+        return address
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def check_deal(name, cascades):
+    """ returns the desk, raises ValueError if the deal is not a whole deck """
+    if name not in GAMES:
+        raise ValueError('unknown game %s' % name)
+    game = GAMES[name]
+    if game is tripeaks:
+        # make_peaks needs the rows and the stock at their sizes
+        if [len(c) for c in cascades] != [2 * n for n in tripeaks.PILE_RANGE]:
+            raise ValueError('piles of %s cards expected' %
+                             '/'.join(str(n) for n in tripeaks.PILE_RANGE))
+    desk = game.new_desk()
+    try:
+        game.deal(desk, cascades)
+    except ValueError:
+        raise ValueError('bad card')
+    cards = sorted(c for pile in desk for c in pile if c >= 0)
+    if cards != range(game.CARD_NUM):
+        raise ValueError('not a whole deck')
+    return desk
+
+
+def work(tasks, events, index, cancel, deadline):
+    """
+    A worker process: solves the tasks one by one. The search stops at
+    the next layer once cancel holds the job or the deadline has passed.
+    deadline holds (job, time) once the deadline of a job is put off; the
+    one left by a job done before is ignored.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, name, cascades, end = task
+        events.put((job, 'start', index))
+
+        layers = [0]
+        shown = [time.time()]
+
+        def watch(entries):
+            layers[0] += 1
+            now = time.time()
+            if now - shown[0] >= PROGRESS_TIME:
+                shown[0] = now
+                events.put((job, 'progress', '%d %d' % (layers[0], entries)))
+            with deadline.get_lock():
+                limit = deadline[1] if deadline[0] == job else end
+            return cancel.value == job or now > limit
+
+        try:
+            desk = check_deal(name, cascades)
+            if watch(0):
+                raise search.Cancelled()
+            moves = GAMES[name].get_solution(desk, watch=watch)
+            events.put((job, 'solution', ' '.join(str(m) for m in moves or [])))
+        except search.Cancelled:
+            events.put((job, 'cancelled' if cancel.value == job else 'timeout', ''))
+        except Exception, e:
+            events.put((job, 'error', str(e)))
+
+
+class Client:
+    """ one request; the lines for it are put to its queue """
+
+    def __init__(self, seconds):
+        self.deadline = time.time() + seconds
+        self.lines = Queue.Queue()
+        self.job = None
+
+
+class Job:
+    def __init__(self, id, key):
+        self.id = id
+        self.key = key
+        self.clients = []
+        self.deadline = 0
+        self.worker = None  # the index of the worker once started
+        self.cancelled = False
+
+
+FINAL = ('solution', 'timeout', 'cancelled', 'error')
+
+
+class Service:
+    def __init__(self, workers=None):
+        workers = workers or multiprocessing.cpu_count()
+        self.tasks = multiprocessing.Queue()
+        self.events = multiprocessing.Queue()
+        self.cancels = [multiprocessing.Value('l', -1) for i in range(workers)]
+        self.deadlines = [multiprocessing.Array('d', [-1, 0]) for i in range(workers)]
+        self.workers = []
+        for i in range(workers):
+            p = multiprocessing.Process(target=work, args=(
+                self.tasks, self.events, i, self.cancels[i], self.deadlines[i]))
+            p.daemon = True
+            p.start()
+            self.workers.append(p)
+
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.jobs = {}      # id -> Job
+        self.by_key = {}    # (game, cascades) -> the Job that is not over
+        self.waiting = 0    # jobs queued but not started
+        self.running = 0
+        self.counters = dict.fromkeys(
+            ['requests', 'coalesced', 'solution', 'timeout', 'cancelled', 'error'], 0)
+        self.peak_waiting = 0
+
+        thread = threading.Thread(target=self.dispatch)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        for p in self.workers:
+            self.tasks.put(None)
+        for p in self.workers:
+            p.join()
+        self.events.put(None)
+
+    def submit(self, name, cascades, seconds):
+        """ returns the Client to read the answer from """
+        check_deal(name, cascades)
+        client = Client(seconds)
+        key = name, tuple(cascades)
+
+        with self.lock:
+            self.counters['requests'] += 1
+            job = self.by_key.get(key)
+            if job is None:
+                job = Job(next(self.ids), key)
+                self.jobs[job.id] = job
+                self.by_key[key] = job
+                job.deadline = client.deadline
+                self.tasks.put((job.id, name, cascades, job.deadline))
+                self.waiting += 1
+                self.peak_waiting = max(self.peak_waiting, self.waiting)
+            else:
+                self.counters['coalesced'] += 1
+                if client.deadline > job.deadline:
+                    job.deadline = client.deadline
+                    if job.worker is not None:
+                        self.extend(job)
+            job.clients.append(client)
+            client.job = job
+            client.lines.put(('queued', str(self.waiting)))
+        return client
+
+    def leave(self, client, kind):
+        """ the client gives up; the job is cancelled once nobody waits """
+        with self.lock:
+            job = client.job
+            if client in job.clients:
+                job.clients.remove(client)
+                self.counters[kind] += 1
+                client.lines.put((kind, ''))
+                if not job.clients:
+                    job.cancelled = True
+                    self.by_key.pop(job.key, None)
+                    if job.worker is not None:
+                        self.cancels[job.worker].value = job.id
+
+    def extend(self, job):
+        """ puts off the deadline of a started job, the next job ignores it """
+        deadline = self.deadlines[job.worker]
+        with deadline.get_lock():
+            deadline[0] = job.id
+            deadline[1] = job.deadline
+
+    def dispatch(self):
+        """ routes the events of the workers to the clients """
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            id, kind, text = event
+            with self.lock:
+                job = self.jobs[id]
+                if kind == 'start':
+                    job.worker = text
+                    self.waiting -= 1
+                    self.running += 1
+                    self.extend(job)
+                    if job.cancelled:
+                        self.cancels[job.worker].value = job.id
+                    continue
+
+                clients = job.clients
+                if kind in FINAL:
+                    self.running -= 1
+                    del self.jobs[id]
+                    if self.by_key.get(job.key) is job:
+                        del self.by_key[job.key]
+                    job.clients = []  # so a late leave() does not count
+                    self.counters[kind] += len(clients)
+                for client in clients:
+                    client.lines.put((kind, text))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['waiting'] = self.waiting
+            stats['running'] = self.running
+            stats['peak_waiting'] = self.peak_waiting
+            stats['workers'] = len(self.workers)
+        return stats
+
+
+class Handler(SocketServer.StreamRequestHandler):
+    def finish(self):
+        try:
+            SocketServer.StreamRequestHandler.finish(self)
+        except socket.error:
+            pass  # the client is gone
+
+    def write(self, kind, text=''):
+        self.wfile.write(('%s %s' % (kind, text)).rstrip() + '\n')
+        self.wfile.flush()
+
+    def handle(self):
+        service = self.server.service
+        words = self.rfile.readline().split()
+        if not words:
+            return
+        if words[0] == 'stats':
+            stats = service.stats()
+            self.write('stats', ' '.join('%s=%s' % (k, stats[k]) for k in sorted(stats)))
+            return
+
+        try:
+            client = service.submit(words[0], [w.upper() for w in words[2:]], float(words[1]))
+        except (IndexError, ValueError), e:
+            self.write('error', str(e) or 'bad request')
+            return
+
+        def read():
+            # any line or the end of the connection cancels the request
+            try:
+                self.rfile.readline()
+            except socket.error:
+                pass
+            service.leave(client, 'cancelled')
+
+        reader = threading.Thread(target=read)
+        reader.daemon = True
+        reader.start()
+
+        try:
+            while True:
+                try:
+                    kind, text = client.lines.get(timeout=max(0, client.deadline - time.time()))
+                except Queue.Empty:
+                    service.leave(client, 'timeout')
+                    continue
+                self.write(kind, text)
+                if kind in FINAL:
+                    break
+        except socket.error:
+            service.leave(client, 'cancelled')
+
+
+class TCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(address=ADDRESS, workers=None):
+    address = parse_address(address)
+    service = Service(workers)
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)
+        server = UnixServer(address, Handler)
+    else:
+        server = TCPServer(address, Handler)
+    server.service = service
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    service.close()
+
+
+def request(address, line):
+    """ sends a request line, yields the lines of the answer """
+    address = parse_address(address)
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.connect(address)
+    f = s.makefile('rw')
+    f.write(line + '\n')
+    f.flush()
+    try:
+        for answer in f:
+            yield answer.rstrip('\n')
+    finally:
+        f.close()
+        s.close()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    what = args.pop(0) if args else None
+    address = ADDRESS
+    if args and (args[0] not in GAMES and not args[0].isdigit()):
+        address = args.pop(0)
+
+    if what == 'serve':
+        serve(address, int(args[0]) if args else None)
+    elif what == 'solve' and len(args) > 2:
+        for answer in request(address, ' '.join(args)):
+            print answer
+    elif what == 'stats':
+        for answer in request(address, 'stats'):
+            print answer
+    else:
+        print __doc__
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+import freecell_v1 as fc
+
+
+def sample_desks(deals=(1, 2, 3, 617), plays=4, length=80, seed=1):
+    """ the desks along random playouts of some deals """
+    rand = random.Random(seed)
+    desks = []
+    for n in deals:
+        for p in range(plays):
+            desk = fc.new_desk()
+            fc.deal_by_number(desk, n)
+            for i in range(length):
+                desks.append(fc.clone(desk))
+                moves = fc.get_moves(desk)
+                if not moves:
+                    break
+                fc.move_card(desk, rand.choice(moves))
+    return desks
+
+
+@unittest.skipIf(fc.numpy is None, "numpy is not installed")
+class LayerTest(unittest.TestCase):
+    def setUp(self):
+        self.desks = sample_desks()
+        self.layer = fc.numpy.array([fc.pack_desk(desk) for desk in self.desks])
+
+    def test_pack(self):
+        for desk, row in zip(self.desks, self.layer):
+            self.assertEqual(fc.unpack_desk(row)[:fc.CELL_END], desk[:fc.CELL_END])
+
+    def test_moves(self):
+        rows, moves = fc.get_layer_moves(self.layer)
+        found = [[] for desk in self.desks]
+        for row, move in zip(rows.tolist(), moves.tolist()):
+            found[row].append(move)
+        for desk, layer_moves in zip(self.desks, found):
+            self.assertEqual(layer_moves, fc.get_moves(desk))
+
+    def test_auto_moves(self):
+        autos = fc.auto_move_layer(self.layer)
+        for desk, row, layer_moves in zip(self.desks, self.layer, autos):
+            moves = []
+            fc.auto_move_to_bases(desk, moves)
+            self.assertEqual(layer_moves, moves)
+            self.assertEqual(fc.unpack_desk(row)[:fc.CELL_END], desk[:fc.CELL_END])
+
+    def test_scores(self):
+        scores = fc.get_layer_scores(self.layer).tolist()
+        self.assertEqual(scores, [fc.get_score(desk) for desk in self.desks])
+
+    def test_base_keys(self):
+        base_keys, pile_keys = fc.get_layer_keys(self.layer)
+        self.assertEqual(base_keys.tolist(), [fc.get_base_key(desk) for desk in self.desks])
+
+
+if __name__ == '__main__':
+    unittest.main()
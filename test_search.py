@@ -0,0 +1,89 @@
+import unittest
+
+import search
+
+
+class Graph:
+    """ a STATE walking a directed graph of named nodes """
+
+    def __init__(self, edges, start, goal, estimates=None):
+        self.edges = edges
+        self.node = start
+        self.goal = goal
+        self.estimates = estimates or {}
+        self.history = []
+
+    def moves(self):
+        return self.edges.get(self.node, [])
+
+    def apply(self, move):
+        self.history.append(self.node)
+        self.node = move
+
+    def undo(self, move):
+        self.node = self.history.pop()
+
+    def key(self):
+        return self.node
+
+    def is_goal(self):
+        return self.node == self.goal
+
+    def heuristic(self):
+        return self.estimates.get(self.node, 0)
+
+
+class IdaTest(unittest.TestCase):
+    def test_transposition_dead_end(self):
+        # b reaches c after a did, so b returns no bound of its own
+        edges = {'r': ['a', 'b'], 'a': ['c'], 'b': ['c'], 'c': ['g']}
+        self.assertEqual(search.ida(Graph(edges, 'r', 'g')), ['a', 'c', 'g'])
+
+    def test_unsolvable(self):
+        edges = {'r': ['a'], 'a': ['r']}
+        self.assertEqual(search.ida(Graph(edges, 'r', 'g')), None)
+
+
+class BeamTest(unittest.TestCase):
+    edges = {'r': ['a', 'b'], 'b': ['g']}
+    estimates = {'a': 0, 'b': 1}
+
+    def test_width(self):
+        # the narrow beam keeps only the dead end a
+        state = Graph(self.edges, 'r', 'g', self.estimates)
+        self.assertEqual(search.beam(state, 1), None)
+        self.assertEqual(search.beam(state, 2), ['b', 'g'])
+        self.assertEqual(state.node, 'r')
+
+    def test_found(self):
+        ends = []
+
+        def found(state, line):
+            ends.append((state.node, line))
+            return False
+
+        state = Graph(self.edges, 'r', 'g', self.estimates)
+        self.assertEqual(search.beam(state, 2, found=found), None)
+        self.assertEqual(ends, [('a', ['a']), ('g', ['b', 'g'])])
+
+
+class BestFirstTest(unittest.TestCase):
+    edges = {'r': ['a', 'c'], 'a': ['b'], 'b': ['g'], 'c': ['g']}
+    estimates = {'a': 0, 'b': 0, 'c': 5}
+
+    def test_greedy(self):
+        state = Graph(self.edges, 'r', 'g', self.estimates)
+        self.assertEqual(search.best_first(state), ['a', 'b', 'g'])
+        self.assertEqual(state.node, 'r')
+
+    def test_a_star(self):
+        state = Graph(self.edges, 'r', 'g', {'a': 1, 'b': 1, 'c': 1})
+        self.assertEqual(search.best_first(state, search.by_cost), ['c', 'g'])
+
+    def test_unsolvable(self):
+        state = Graph({'r': ['a'], 'a': ['r']}, 'r', 'g')
+        self.assertEqual(search.best_first(state), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,12 @@ The game is won if all three peaks are cleared.
 
 """
 
+import collections
+import sys
+
+import search
+from search import Stats
+
 _debug = __name__ == '__main__'
 
 if _debug:
@@ -243,6 +249,34 @@ def rate_desk(desk):
     total += 500
   return total
 
+PEAKS_BONUS = 5000 + 1000 + 500  # rate_desk of the cleared peaks
+
+def rate_bound(entry):
+  """ the score if the rest of the tableau goes in one sequence """
+  moves, stock, points, bonus, cards = entry
+  # bonus + (bonus + 200) + ... + (bonus + 200 * (cards - 1))
+  return points + cards * bonus + 100 * cards * (cards - 1) + PEAKS_BONUS
+
+# ENTRY of a frontier is defined as:
+# (moves, stock pointer, rate_moves(moves), next bonus, cards on the tableau)
+# the numbers are kept up to date move by move, so the frontier can be
+# ranked and pruned without replaying the moves
+
+def root_entry(desk):
+  cards = 0
+  for i in range(PILE_NUM):
+    cards += len(desk[i]) - desk[i].count(EMPTY_CELL)
+  return [], desk[STOCK_POS].index(EMPTY_CELL), 0, 100, cards
+
+def next_entry(entry, move):
+  moves, stock, points, bonus, cards = entry
+  new_moves = moves[:]
+  new_moves.append(move)
+  if move % DESK_SIZE == STOCK_POS:
+    return new_moves, stock - 1, points, 100, cards
+  else:
+    return new_moves, stock, points + bonus, bonus + 200, cards - 1
+
 def is_card_playable(desk, pile, index):
     card = desk[pile][index]
     if card == EMPTY_CELL:
@@ -285,62 +319,18 @@ class Solution:
     self.best_moves = None
     self.points = 0
 
-def test_moves(desk, src_moves, src_done, solution):
-    dst_moves = []
-
-    for moves in src_moves:
-        move_cards(desk, moves)
-
-        if is_empty(desk):
-          n = rate_moves(moves) + rate_desk(desk)
-          if solution.win_moves == None or n > solution.points:
-            solution.win_moves = moves
-            solution.points = n
-            if _debug:
-              print "Found solution: %d points, %d moves" % (n, len(moves))
-        else:
-          key = desk_to_key(desk)
-          if key not in src_done:
-            src_done.add(key)
-            
-            next_moves = get_moves(desk)
-            if next_moves:
-              for move in next_moves:
-                new_moves = moves[:]
-                new_moves.append(move)
-                dst_moves.append(new_moves)
-            elif solution.win_moves == None:
-              n = rate_moves(moves) + rate_desk(desk)
-              if n > solution.points:
-                solution.best_moves = moves
-                solution.points = n
-
-        move_cards_reverse(desk, moves)  # restore
-
-    return dst_moves
-
-
-DESK_NUM_MAX = 10000
-DESK_NUM_MIN = 1000
-
-
 def add_to_set_at(src, i, j):
     if i not in src:
         src[i] = set()
     src[i].add(j)
 
 
-def split(desk, moves, threshold):
+def split(entries, threshold):
     strategy = {}
 
-    for i, m in enumerate(moves):
-        move_cards(desk, m)
-
+    for i, entry in enumerate(entries):
         # the less cards from the stock is used the better
-        n = desk[STOCK_POS].index(EMPTY_CELL)
-        add_to_set_at(strategy, n, i)
-
-        move_cards_reverse(desk, m)
+        add_to_set_at(strategy, entry[1], i)
 
     keys = strategy.keys()
     keys.sort()
@@ -349,76 +339,318 @@ def split(desk, moves, threshold):
     while len(mask_a) < threshold:
         mask_a |= strategy.pop(keys.pop())
 
-    mask_b = set(xrange(len(moves))) - mask_a
-    return [moves[i] for i in mask_a], [moves[i] for i in mask_b]
+    mask_b = set(xrange(len(entries))) - mask_a
+    return [entries[i] for i in mask_a], [entries[i] for i in mask_b]
+
+def clearing_order(move):
+    """ sort key: tableau cards before the stock, upper rows first """
+    pile = move % DESK_SIZE
+    if pile == STOCK_POS:
+        return -1
+    return PILE_NUM - pile
 
-def get_solution(desk):
+
+class LimitReached(Exception):
+    """ raised by is_solvable when it gives up before the answer """
+
+
+def is_solvable(desk, stats=None, limit=None):
     """
+    Depth-first search that stops as soon as the peaks are cleared.
 
     :param desk:
-    :return solution:
+    :param stats: optional Stats to collect the search counters
+    :param limit: optional number of states to give up after, the search
+                  raises LimitReached then
+    :return clearing moves or None if the deal is unsolvable:
     """
-    src_moves = [[move] for move in get_moves(desk)]
-    
-    src_done = set()
-    reserve = []
-
-    solution = None
-    partial_solution = None
-    n_max = -1
-
-    while True:
-        while src_moves:
-          if _debug:
-              print "moves %10d\ttotal %10d" % (len(src_moves), len(src_done))
-          if len(src_moves) > DESK_NUM_MAX:
-              if _debug:
-                  print "Splitting..."
+    if stats is None:
+        stats = Stats()
 
-              a, b = split(desk, src_moves, DESK_NUM_MIN)
-              reserve.append(b)
-              src_moves = a
-              if _debug:
-                  print "Split #%d -> %d+%d" % (len(reserve), len(a), len(b))
+    nodes = 0
+    done = set([desk_to_key(desk)])
+    moves = []
+    # the next move to try is at the end of each list
+    stack = [sorted(get_moves(desk), key=clearing_order)]
 
-          dst_moves = []
+    while stack:
+        if not stack[-1]:
+            stack.pop()
+            if moves:
+                move_cards_reverse(desk, [moves.pop()])
+            continue
 
-          for moves in src_moves:
-            move_cards(desk, moves)
+        if limit is not None and nodes >= limit:
+            move_cards_reverse(desk, moves)  # restore
+            raise LimitReached()
 
-            if is_empty(desk):
-              if solution == None or rate_moves(moves) > rate_moves(solution):
-                solution = moves
-                if _debug:
-                  print "Found %d moves solution" % len(moves)
-            else:
-              m = desk_to_key(desk)
-              if m not in src_done:
-                src_done.add(m)
-          
-                next_moves = get_moves(desk)
-                if next_moves:
-                  for move in next_moves:
-                    new_moves = moves[:]
-                    new_moves.append(move)
-                    dst_moves.append(new_moves)
-                elif solution == None:
-                  n = rate_desk(desk) + rate_moves(moves)
-                  if n > n_max:
-                    n_max = n
-                    partial_solution = moves
+        move = stack[-1].pop()
+        move_card(desk, move)
+        moves.append(move)
+        nodes += 1
+        stats.nodes += 1
 
+        if is_empty(desk):
+            solution = moves[:]
             move_cards_reverse(desk, moves)  # restore
+            return solution
+
+        key = desk_to_key(desk)
+        if key in done:
+            stats.dups += 1
+            move_cards_reverse(desk, [moves.pop()])
+        else:
+            done.add(key)
+            if len(moves) > stats.depth:
+                stats.depth = len(moves)
+            stack.append(sorted(get_moves(desk), key=clearing_order))
+
+    return None
+
+
+DESK_NUM_MAX = 10000  # entries a frontier is never split below
+DESK_NUM_MIN = 1000   # entries a split keeps at least
+
+
+class Layers(search.Layers):
+    """
+    The layered search of get_solution. It goes on after a solution for a
+    better score, and one done-table serves all the parts of the frontier.
+    """
+
+    first = False
+
+    def __init__(self, desk, known, control, watch=None):
+        search.Layers.__init__(self, control, search.Checkpoint(stats=control.stats), watch)
+        self.desk = desk
+        self.known = known
+        self.done = set()
+        self.pruned = 0
+
+    def keys(self, done):
+        return len(self.done)
+
+    def split(self, entries, n):
+        if _debug:
+            print "Splitting at %d bytes..." % self.stats.memory
+        a, b = split(entries, n)
+        if _debug:
+            print "Split -> %d+%d" % (len(a), len(b))
+        return a, b
+
+    def stepped_back(self, done, state):
+        if _debug:
+            print "Step back to %d split" % (len(state[3]) + 1)
+
+    def expand(self, src_moves, src_done, solution):
+        """ solution is a Solution, src_done is not used """
+        if _debug:
+            print "moves %10d\ttotal %10d\tpruned %10d" % (len(src_moves), len(self.done), self.pruned)
+        desk = self.desk
+        known = self.known
+        dst_moves = []
+
+        for entry in src_moves:
+          if solution.win_moves != None and rate_bound(entry) <= solution.points:
+            self.pruned += 1
+            continue  # cannot beat the solution found
+
+          moves = entry[0]
+          move_cards(desk, moves)
+
+          if is_empty(desk):
+            n = entry[2] + rate_desk(desk)
+            if solution.win_moves == None or n > solution.points:
+              solution.win_moves = moves
+              solution.points = n
+              if _debug:
+                print "Found %d moves solution" % len(moves)
+          else:
+            m = desk_to_key(desk)
+            if m not in self.done:
+              self.done.add(m)
+
+              next_moves = get_moves(desk)
+              if known and m in known:
+                # follow the known line instead of searching on
+                dst_moves.append(reduce(next_entry, known[m], entry))
+              elif next_moves:
+                for move in next_moves:
+                  dst_moves.append(next_entry(entry, move))
+              elif solution.win_moves == None:
+                n = rate_desk(desk) + entry[2]
+                if n > solution.points:
+                  solution.best_moves = moves
+                  solution.points = n
+            else:
+              self.stats.dups += 1
 
-          src_moves = dst_moves
+          move_cards_reverse(desk, moves)  # restore
 
-        if not reserve:
-            break
+        return solution, dst_moves, None
+
+
+def get_solution(desk, known=None, stats=None, budget=None, watch=None):
+    """
+
+    :param desk:
+    :param known: optional {desk_to_key: moves} of lines to trust
+    :param stats: optional Stats to collect the frontier decisions
+    :param budget: the bytes the frontier and the done-table may take;
+                   None splits by the entry count, DESK_NUM_MAX and
+                   DESK_NUM_MIN, and search.MEMORY_BUDGET beyond
+    :param watch: optional function(entries) called every layer, the search
+                  raises search.Cancelled when it returns True
+    :return solution:
+    """
+    key_bytes = sys.getsizeof(desk_to_key(desk))
+    if budget is None:
+        control = search.FrontierControl(key_bytes, search.MEMORY_BUDGET, stats,
+                                         least=DESK_NUM_MAX, keep=DESK_NUM_MIN)
+    else:
+        control = search.FrontierControl(key_bytes, budget, stats)
+    layers = Layers(desk, known, control, watch)
+    root = root_entry(desk)
+    src_moves = [next_entry(root, move) for move in get_moves(desk)]
+
+    solution = layers.run(layers.start(src_moves, None, Solution()))
+    return solution.win_moves or solution.best_moves
+
+
+BEAM_WIDTH = 1000
+
+
+def rate_state(desk, moves):
+    """ beam search evaluator: the points so far and the cards in reach """
+    playable = 0
+    for p in range(PILE_NUM):
+        for i in range(len(desk[p])):
+            if is_card_playable(desk, p, i):
+                playable += 1
+    stock = desk[STOCK_POS].index(EMPTY_CELL)
+    return rate_moves(moves) + rate_desk(desk) + 100 * (playable + stock)
+
+
+class State:
+    """ a desk for the search module, the goal is to clear the peaks """
+
+    def __init__(self, desk):
+        self.desk = desk
+
+    def moves(self):
+        return get_moves(self.desk)
+
+    def apply(self, move):
+        move_card(self.desk, move)
+
+    def undo(self, move):
+        move_cards_reverse(self.desk, [move])
+
+    def replay(self, moves):
+        move_cards(self.desk, moves)
+
+    def rewind(self, moves):
+        move_cards_reverse(self.desk, moves)
+
+    def key(self):
+        return desk_to_key(self.desk)
+
+    def is_goal(self):
+        return is_empty(self.desk)
+
+    def heuristic(self):
+        """ the cards left on the tableau, each takes a move """
+        return root_entry(self.desk)[4]
+
+
+def beam_search(desk, width=BEAM_WIDTH, evaluate=rate_state, stats=None):
+    """
+    search.beam that goes on after a clearing line for a better score.
+
+    :param desk:
+    :param width: lines kept per layer
+    :param evaluate: function(desk, moves) that ranks the lines
+    :param stats: optional Stats to collect the search counters
+    :return Solution:
+    """
+    solution = Solution()
+
+    def found(state, moves):
+        n = rate_moves(moves) + rate_desk(desk)
+        if is_empty(desk):
+            if solution.win_moves == None or n > solution.points:
+                solution.win_moves = moves
+                solution.points = n
+        elif solution.win_moves == None and n > solution.points:
+            solution.best_moves = moves
+            solution.points = n
+        return False  # search on, a later line may score more
+
+    search.beam(State(desk), width, lambda state, moves: evaluate(desk, moves),
+                found, stats)
+    return solution
+
+
+HINT_TABLE_MAX = 100000  # positions kept by a HintSession
+HINT_WIDTH = 100         # beam_search width of a hint off the known lines
+
+
+class HintSession:
+    """
+    Gives a hint after every move of the player.
+
+    The best line found is remembered for every position along it, so as
+    long as the player follows the hints, the next hint is a lookup. When the
+    player goes astray, a beam_search of the given width finds a new line
+    in a fraction of a second. With width None it is get_solution instead,
+    which stops at the remembered positions it reaches but may take minutes.
+    """
+
+    def __init__(self, desk, size=HINT_TABLE_MAX, width=HINT_WIDTH):
+        self.desk = clone(desk)
+        self.moves = []
+        self.size = size
+        self.width = width
+        self.table = collections.OrderedDict()  # desk_to_key -> moves
+        self.hits = 0
+        self.searches = 0
+
+    def play(self, move):
+        move_card(self.desk, move)
+        self.moves.append(move)
+
+    def hint(self):
+        """ returns the next move of the best line known, or None """
+        if is_empty(self.desk):
+            return None
+        key = desk_to_key(self.desk)
+        line = self.table.pop(key, None)
+        if line:
+            self.table[key] = line  # the most recently used goes last
+            self.hits += 1
         else:
-            if _debug:
-                print "Step back to %d split" % len(reserve)
-            src_moves = reserve.pop()
-    return solution if solution else partial_solution
+            if self.width is None:
+                line = get_solution(self.desk, self.table)
+            else:
+                solution = beam_search(self.desk, self.width)
+                line = solution.win_moves or solution.best_moves
+            self.searches += 1
+            if not line:
+                return None
+            self.remember(line)
+        return line[0]
+
+    def remember(self, line):
+        desk = self.desk
+        for i, move in enumerate(line):
+            key = desk_to_key(desk)
+            self.table.pop(key, None)
+            self.table[key] = line[i:]
+            move_card(desk, move)
+        move_cards_reverse(desk, line)  # restore
+
+        while len(self.table) > self.size:
+            self.table.popitem(last=False)
 
 
 if _debug:
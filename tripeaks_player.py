@@ -0,0 +1,193 @@
+"""
+Tri Peaks player that does not peek at the face-down cards.
+
+tripeaks.get_solution knows the whole layout, a real player sees only the
+face-up cards and the top of the waste pile. Before each move the player
+samples many deals consistent with what it can see (the unseen cards
+shuffled over the hidden places), plays every candidate move out on each
+sample and picks the move with the best total. The samples are spread over a
+process pool until the time budget of the decision runs out.
+
+Usage:
+
+  python tripeaks_player.py [first_deal] [deal_count] [seconds_per_decision]
+
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+
+import tripeaks
+
+DECISION_TIME = 0.5  # seconds per decision
+SAMPLE_BATCH = 8     # sampled deals per task
+SOLVER_LIMIT = 1000  # states is_solvable may spend on a sampled deal
+
+
+def get_hidden(desk):
+    """ returns the places of the cards the player cannot see """
+    places = []
+    for p in range(tripeaks.PILE_NUM):
+        for i in range(len(desk[p])):
+            if (desk[p][i] != tripeaks.EMPTY_CELL and
+                    not tripeaks.is_card_playable(desk, p, i)):
+                places.append((p, i))
+    # the stock behind the stock pointer
+    for i in range(desk[tripeaks.STOCK_POS].index(tripeaks.EMPTY_CELL)):
+        places.append((tripeaks.STOCK_POS, i))
+    return places
+
+
+def sample_deal(desk, places, rnd):
+    """ shuffles the unseen cards over their places """
+    cards = [desk[p][i] for p, i in places]
+    rnd.shuffle(cards)
+    for (p, i), card in zip(places, cards):
+        desk[p][i] = card
+
+
+def rollout(desk, moves, rnd):
+    """
+    Plays the desk out at random, tableau cards before the stock.
+
+    :param desk: restored on return
+    :param moves: the moves played so far
+    :return points:
+    """
+    n = len(moves)
+    moves = moves[:]
+    while True:
+        next_moves = tripeaks.get_moves(desk)
+        if not next_moves:
+            break
+        peaks = [m for m in next_moves if m % tripeaks.DESK_SIZE != tripeaks.STOCK_POS]
+        move = rnd.choice(peaks) if peaks else next_moves[0]
+        tripeaks.move_card(desk, move)
+        moves.append(move)
+
+    points = tripeaks.rate_moves(moves) + tripeaks.rate_desk(desk)
+    tripeaks.move_cards_reverse(desk, moves[n:])  # restore
+    return points
+
+
+def solve_out(desk, moves, rnd):
+    """ like rollout, but tries to clear the peaks with the solver first """
+    try:
+        line = tripeaks.is_solvable(desk, limit=SOLVER_LIMIT)
+    except tripeaks.LimitReached:
+        line = None
+    if line is None:
+        return rollout(desk, moves, rnd)
+    return tripeaks.rate_moves(moves + line) + tripeaks.PEAKS_BONUS
+
+
+def rate_candidates(task):
+    desk, moves, candidates, seed, samples, solver = task
+    rnd = random.Random(seed)
+    play_out = solve_out if solver else rollout
+    places = get_hidden(desk)
+
+    totals = [0] * len(candidates)
+    for n in xrange(samples):
+        sample_deal(desk, places, rnd)
+        for i, move in enumerate(candidates):
+            tripeaks.move_card(desk, move)
+            moves.append(move)
+            totals[i] += play_out(desk, moves, rnd)
+            tripeaks.move_cards_reverse(desk, [moves.pop()])
+    return totals
+
+
+class Player:
+    def __init__(self, budget=DECISION_TIME, processes=None, solver=False):
+        self.budget = budget
+        self.solver = solver
+        self.processes = processes or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.processes)
+
+        self.decisions = 0
+        self.samples = 0
+        self.time = 0.0
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def choose(self, desk, moves):
+        """
+        Picks the next move.
+
+        :param desk: the real desk, only the face-up cards are relied on
+        :param moves: the moves played so far
+        :return move or None:
+        """
+        candidates = tripeaks.get_moves(desk)
+        if len(candidates) < 2:
+            return candidates[0] if candidates else None
+
+        start = time.time()
+        deadline = start + self.budget
+        totals = [0] * len(candidates)
+        pending = []
+        samples = 1 if self.solver else SAMPLE_BATCH
+
+        while True:
+            # keep every worker busy until the time is out
+            while len(pending) < self.processes and time.time() < deadline:
+                task = (desk, moves, candidates, random.getrandbits(32),
+                        samples, self.solver)
+                pending.append(self.pool.apply_async(rate_candidates, (task,)))
+            if not pending:
+                break
+            for i, n in enumerate(pending.pop(0).get()):
+                totals[i] += n
+            self.samples += samples
+
+        self.decisions += 1
+        self.time += time.time() - start
+        return candidates[totals.index(max(totals))]
+
+    def play(self, desk):
+        """ plays the desk out and restores it; returns the moves """
+        moves = []
+        while True:
+            move = self.choose(desk, moves)
+            if move is None:
+                break
+            tripeaks.move_card(desk, move)
+            moves.append(move)
+        tripeaks.move_cards_reverse(desk, moves)  # restore
+        return moves
+
+    def rate(self):
+        """ decisions per second """
+        return self.decisions / self.time if self.time else 0.0
+
+
+if __name__ == '__main__':
+    first = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else DECISION_TIME
+
+    player = Player(budget)
+    x = tripeaks.new_desk()
+    wins = 0
+
+    for n in range(first, first + count):
+        tripeaks.deal_by_number(x, n)
+        moves = player.play(x)
+        tripeaks.move_cards(x, moves)
+        points = tripeaks.rate_moves(moves) + tripeaks.rate_desk(x)
+        if tripeaks.is_empty(x):
+            wins += 1
+        print "Deal %d: %d points, %s" % (n, points, "WIN!" if tripeaks.is_empty(x) else "lost")
+
+    player.close()
+
+    print "o" + "-=" * 25
+    print "| Won %d of %d deals" % (wins, count)
+    print "| %d decisions, %.1f decisions/sec, %d samples" % (
+        player.decisions, player.rate(), player.samples)
+    print "o" + "-=" * 25
@@ -0,0 +1,189 @@
+"""
+Solvability survey of Tri Peaks deals.
+
+Deals are produced by tripeaks.deal_by_number and checked with
+tripeaks.is_solvable. Seeds are handed out to a process pool in chunks, each
+worker returns only the counters of its chunk, and the totals are written to a
+checkpoint file from time to time, so an interrupted survey can be resumed.
+
+The first clearing line is_solvable finds depends on its move ordering, not
+on what the deal is worth, so the optional score histogram comes from
+tripeaks.beam_search at SCORE_WIDTH instead: the best score it reaches on
+every score_every-th deal, solvable or not. Scoring a deal costs more than
+checking it, so it is off by default.
+
+Usage:
+
+  python tripeaks_survey.py [first_seed] [seed_count] [checkpoint_file] [score_every]
+
+"""
+
+import math
+import marshal
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import tripeaks
+
+CHUNK_SIZE = 500        # seeds per task
+CHECKPOINT_TIME = 60    # seconds between checkpoints
+SCORE_STEP = 1000       # width of a score histogram bucket
+SCORE_WIDTH = 100       # beam_search width the deals are scored with
+COST_STEPS = 4          # cost histogram buckets per doubling of nodes
+
+
+def add_to_count_at(src, i, n=1):
+    src[i] = src.get(i, 0) + n
+
+
+def cost_bucket(nodes):
+    return int(COST_STEPS * math.log(nodes + 1, 2))
+
+
+def bucket_cost(bucket):
+    """ the upper bound of the nodes in the cost bucket """
+    return int(2 ** (float(bucket + 1) / COST_STEPS))
+
+
+def survey_chunk(task):
+    first, count, score_every = task
+    desk = tripeaks.new_desk()
+
+    solved = 0
+    scores = {}
+    costs = {}
+
+    for n in xrange(first, first + count):
+        tripeaks.deal_by_number(desk, n)
+        stats = tripeaks.Stats()
+        if tripeaks.is_solvable(desk, stats):
+            solved += 1
+        add_to_count_at(costs, cost_bucket(stats.nodes))
+
+        if score_every and n % score_every == 0:
+            points = tripeaks.beam_search(desk, SCORE_WIDTH).points
+            add_to_count_at(scores, points // SCORE_STEP)
+
+    return count, solved, scores, costs
+
+
+class Survey:
+    def __init__(self, first, count, score_every=0):
+        self.first = first
+        self.count = count
+        self.score_every = score_every  # seeds per scored seed, 0 for none
+        self.next = first   # seeds below are surveyed
+        self.deals = 0
+        self.solved = 0
+        self.scores = {}    # beam_search score // SCORE_STEP -> deals
+        self.costs = {}     # cost_bucket(nodes) -> deals
+
+    def add(self, result):
+        count, solved, scores, costs = result
+        self.next += count
+        self.deals += count
+        self.solved += solved
+        for k, v in scores.iteritems():
+            add_to_count_at(self.scores, k, v)
+        for k, v in costs.iteritems():
+            add_to_count_at(self.costs, k, v)
+
+    def tasks(self):
+        end = self.first + self.count
+        for n in xrange(self.next, end, CHUNK_SIZE):
+            yield n, min(CHUNK_SIZE, end - n), self.score_every
+
+    def is_done(self):
+        return self.next >= self.first + self.count
+
+    def percentile(self, p):
+        """ search cost (expanded nodes) of the p-th percentile deal """
+        limit = self.deals * p / 100.0
+        n = 0
+        for k in sorted(self.costs):
+            n += self.costs[k]
+            if n >= limit:
+                return bucket_cost(k)
+        return 0
+
+    def save(self, path):
+        """ writes the checkpoint atomically """
+        tmp = path + '.tmp'
+        f = open(tmp, 'wb')
+        marshal.dump(self.__dict__, f)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.rename(tmp, path)
+
+    def load(self, path):
+        f = open(path, 'rb')
+        state = marshal.load(f)
+        f.close()
+        if ((state['first'], state['count'], state['score_every']) !=
+                (self.first, self.count, self.score_every)):
+            raise ValueError('%s belongs to another survey' % path)
+        self.__dict__.update(state)
+
+    def report(self):
+        print "o" + "-=" * 25
+        print "| Seeds %d..%d: %d deals" % (self.first, self.next - 1, self.deals)
+        if self.deals:
+            print "| Solvable: %d (%.2f%%)" % (self.solved, 100.0 * self.solved / self.deals)
+            print "| Search cost p50 %d, p90 %d, p99 %d, max %d nodes" % (
+                self.percentile(50), self.percentile(90), self.percentile(99),
+                self.percentile(100))
+        if self.score_every:
+            print "| Scores of one seed in %d by beam search of width %d:" % (
+                self.score_every, SCORE_WIDTH)
+        print "o" + "-=" * 25
+        for k in sorted(self.scores):
+            print "%6d+ points: %d" % (k * SCORE_STEP, self.scores[k])
+
+
+def init_worker():
+    # let the parent process handle Ctrl+C and write the checkpoint
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run(first, count, path=None, processes=None, score_every=0):
+    survey = Survey(first, count, score_every)
+    if path and os.path.exists(path):
+        survey.load(path)
+        print "Resuming at seed %d" % survey.next
+
+    pool = multiprocessing.Pool(processes, init_worker)
+    saved = time.time()
+    try:
+        # ordered results keep the surveyed seeds a contiguous range
+        for result in pool.imap(survey_chunk, survey.tasks()):
+            survey.add(result)
+            if path and time.time() - saved > CHECKPOINT_TIME:
+                survey.save(path)
+                saved = time.time()
+                print "Checkpoint at seed %d" % survey.next
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        print "Interrupted at seed %d" % survey.next
+    pool.join()
+
+    if path:
+        survey.save(path)
+    return survey
+
+
+if __name__ == '__main__':
+    first = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    path = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] != '-' else None
+    score_every = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    job_time = time.time()
+    run(first, count, path, score_every=score_every).report()
+
+    job_time = int(time.time() - job_time)
+    print "Job has taken %d min %d sec." % (job_time // 60, job_time % 60)